@@ -103,11 +103,16 @@ IMAGE_EMBEDDING_DIMENSIONS = int(os.getenv("IMAGE_EMBEDDING_DIMENSIONS", "1408")
 # Vertex AI Configuration (required for multimodalembedding@001)
 VERTEX_AI_PROJECT = os.getenv("VERTEX_AI_PROJECT", "")
 VERTEX_AI_LOCATION = os.getenv("VERTEX_AI_LOCATION", "us-central1")
+VERTEX_MAX_CONCURRENCY = int(os.getenv("VERTEX_MAX_CONCURRENCY", "8"))  # parallel embedding requests
 
 # RAG Processing Configuration
 RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", "1000"))  # tokens per chunk
 RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))  # token overlap
 RAG_TOP_K_RESULTS = int(os.getenv("RAG_TOP_K_RESULTS", "10"))  # number of chunks to retrieve
+RAG_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))  # cosine similarity for a hit
+RAG_SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("RAG_SEMANTIC_CACHE_TTL_SECONDS", "60"))  # 0 disables the cache
+RAG_SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("RAG_SEMANTIC_CACHE_MAX_ENTRIES", "64"))  # cached queries per user
+RAG_SKIP_IMAGE_SEARCH_SIMILARITY = float(os.getenv("RAG_SKIP_IMAGE_SEARCH_SIMILARITY", "0.92"))  # 0 always searches images
 
 # Tesseract OCR Path
 # Windows: Set to Tesseract installation path (e.g., C:\Program Files\Tesseract-OCR\tesseract.exe)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -20,6 +21,25 @@ for _logger_name in (
     logging.getLogger(_logger_name).setLevel(logging.WARNING)
 
 
+def warm_up_services():
+    """
+    Create heavyweight service singletons before the first request needs them.
+
+    ImageEmbeddingService is deliberately left out: RAGService creates it on the
+    first image search, so workers that never search images skip the Vertex AI setup.
+    """
+    from ..services.form_service import get_agent_service
+
+    for name, factory in (
+        ("AgentService", get_agent_service),
+    ):
+        try:
+            factory()
+            logger.info("✅ %s warmed up", name)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Failed to warm up %s, it will be created lazily: %s", name, e)
+
+
 # Cleanup job for old form requests
 async def cleanup_old_form_requests():
     """Delete form requests older than 24 hours."""
@@ -45,6 +65,8 @@ async def lifespan(_app: FastAPI):
 
         logger.info("✅ Database tables created/verified")
 
+        # Pay model/client start-up cost before serving traffic
+        await asyncio.to_thread(warm_up_services)
 
         # Schedule cleanup job to run every 24 hours
         scheduler.add_job(
@@ -1,5 +1,8 @@
 """CRUD operations for API token management in the database."""
-from typing import Optional, List
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, List, Tuple
 from datetime import datetime, timezone
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -8,6 +11,53 @@ from sqlalchemy import and_
 
 from ..models.db_api_token import APIToken
 
+# Short-lived cache of successful API token authentications:
+# sha256(token) -> (cache_expires_at, token_id, user_id, token_expires_at)
+# The cache is per process: invalidation on token or user changes only reaches the
+# worker that made the change, so other workers keep accepting a revoked token (or a
+# deleted/deactivated user's token) for at most API_TOKEN_CACHE_TTL_SECONDS.
+API_TOKEN_CACHE_TTL_SECONDS = 10.0
+API_TOKEN_CACHE_MAXSIZE = 50_000
+_api_token_cache: "OrderedDict[str, Tuple[float, str, str, datetime]]" = OrderedDict()
+
+
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_cached_api_token_auth(token: str) -> Optional[Tuple[str, str, datetime]]:
+    """Return (token_id, user_id, expires_at) of a recently authenticated API token, or None."""
+    key = _token_cache_key(token)
+    cached = _api_token_cache.get(key)
+    if cached is None:
+        return None
+    if cached[0] <= time.monotonic():
+        del _api_token_cache[key]
+        return None
+    _api_token_cache.move_to_end(key)
+    return cached[1:]
+
+
+def cache_api_token_auth(token: str, token_id: str, user_id: str, expires_at: datetime) -> None:
+    """Remember a successful API token authentication for a few seconds."""
+    _api_token_cache[_token_cache_key(token)] = (
+        time.monotonic() + API_TOKEN_CACHE_TTL_SECONDS, token_id, user_id, expires_at
+    )
+    while len(_api_token_cache) > API_TOKEN_CACHE_MAXSIZE:
+        _api_token_cache.popitem(last=False)
+
+
+def invalidate_api_token_cache(token_id: str) -> None:
+    """Drop cached authentications of an API token (deleted or deactivated)."""
+    for key in [key for key, cached in _api_token_cache.items() if cached[1] == token_id]:
+        _api_token_cache.pop(key, None)
+
+
+def invalidate_user_api_token_cache(user_id: str) -> None:
+    """Drop cached authentications of all API tokens of a user (deleted or deactivated)."""
+    for key in [key for key, cached in _api_token_cache.items() if cached[2] == user_id]:
+        _api_token_cache.pop(key, None)
+
 
 async def create_api_token(
     db: AsyncSession,
@@ -79,6 +129,7 @@ async def delete_api_token(
     if api_token:
         await db.delete(api_token)
         await db.commit()
+        invalidate_api_token_cache(token_id)
         return True
     return False
 
@@ -106,4 +157,5 @@ async def deactivate_api_token(
         api_token.is_active = False
         await db.commit()
         await db.refresh(api_token)
+        invalidate_api_token_cache(token_id)
     return api_token
@@ -1,9 +1,11 @@
 """CRUD operations for document chunks."""
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, insert
 from sqlalchemy.future import select
 
 from ..models.db_document_chunk import DocumentChunk
+from ..models.db_file import File
 
 
 async def create_chunk(db: AsyncSession, chunk_data: dict) -> DocumentChunk:
@@ -15,12 +17,20 @@ async def create_chunk(db: AsyncSession, chunk_data: dict) -> DocumentChunk:
     return chunk
 
 
-async def create_chunks(db: AsyncSession, chunks_data: List[dict]) -> List[DocumentChunk]:
-    """Batch create document chunks."""
-    chunks = [DocumentChunk(**data) for data in chunks_data]
-    db.add_all(chunks)
+async def create_chunks(db: AsyncSession, chunks_data: List[dict]) -> int:
+    """
+    Batch create document chunks with one multi-row INSERT (no ORM objects are built).
+
+    Chunk ids are generated by the caller, so no primary keys have to be fetched back.
+
+    Returns:
+        Number of chunks inserted
+    """
+    if not chunks_data:
+        return 0
+    await db.execute(insert(DocumentChunk), chunks_data)
     await db.commit()
-    return chunks
+    return len(chunks_data)
 
 
 async def get_chunk_by_id(db: AsyncSession, chunk_id: str) -> Optional[DocumentChunk]:
@@ -39,6 +49,21 @@ async def get_chunks_by_ids(db: AsyncSession, chunk_ids: List[str]) -> List[Docu
     return result.scalars().all()
 
 
+async def get_chunks_with_filenames_by_ids(
+    db: AsyncSession,
+    chunk_ids: List[str]
+) -> List[Tuple[DocumentChunk, Optional[str]]]:
+    """Get multiple chunks by IDs together with their source filename (one joined query)."""
+    if not chunk_ids:
+        return []
+    result = await db.execute(
+        select(DocumentChunk, File.filename)
+        .outerjoin(File, File.id == DocumentChunk.file_id)
+        .filter(DocumentChunk.id.in_(chunk_ids))
+    )
+    return result.all()
+
+
 async def get_chunks_by_file_id(
     db: AsyncSession,
     file_id: str
@@ -70,13 +95,12 @@ async def get_chunks_by_user_id(
 
 
 async def delete_chunks_by_file_id(db: AsyncSession, file_id: str) -> int:
-    """Delete all chunks for a file."""
-    chunks = await get_chunks_by_file_id(db, file_id)
-    count = len(chunks)
-    for chunk in chunks:
-        await db.delete(chunk)
+    """Delete all chunks for a file in one DELETE (chunk contents are never loaded)."""
+    result = await db.execute(
+        delete(DocumentChunk).where(DocumentChunk.file_id == file_id)
+    )
     await db.commit()
-    return count
+    return result.rowcount
 
 
 async def delete_chunk(db: AsyncSession, chunk_id: str) -> bool:
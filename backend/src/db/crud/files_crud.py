@@ -1,9 +1,9 @@
 """CRUD operations for file management in the database."""
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import and_
+from sqlalchemy import and_, case, func, update
 
 from ..models.db_file import File
 
@@ -60,6 +60,36 @@ async def get_user_files(
     return result.scalars().all()
 
 
+async def get_user_files_summary(
+    db: AsyncSession,
+    user_id: str,
+    pdf_chars_per_page: int = 2000
+) -> Tuple[int, int, int]:
+    """
+    Aggregate a user's files in a single query (no rows or BLOBs are loaded).
+
+    Returns:
+        Tuple of (file count, largest PDF page count, estimated total content size).
+        PDFs are estimated at pdf_chars_per_page per page (at least one page),
+        other files by their byte size.
+    """
+    is_pdf = File.content_type == "application/pdf"
+    result = await db.execute(
+        select(
+            func.count(File.id),
+            func.max(case((is_pdf, File.page_count), else_=None)),
+            func.sum(
+                case(
+                    (is_pdf, func.coalesce(File.page_count, 1) * pdf_chars_per_page),
+                    else_=File.file_size,
+                )
+            ),
+        ).filter(File.user_id == user_id)
+    )
+    file_count, max_pdf_pages, total_size = result.one()
+    return file_count or 0, max_pdf_pages or 0, int(total_size or 0)
+
+
 async def get_user_files_metadata_only(
     db: AsyncSession,
     user_id: str,
@@ -126,13 +156,12 @@ async def update_file_status(
     file_id: str,
     status: str
 ) -> bool:
-    """Update file processing status."""
-    file = await get_file_by_id(db, file_id)
-    if file:
-        file.processing_status = status
-        await db.commit()
-        return True
-    return False
+    """Update file processing status (the file BLOB is never loaded)."""
+    result = await db.execute(
+        update(File).where(File.id == file_id).values(processing_status=status)
+    )
+    await db.commit()
+    return result.rowcount > 0
 
 
 async def update_file_page_count(
@@ -140,10 +169,37 @@ async def update_file_page_count(
     file_id: str,
     page_count: int
 ) -> bool:
-    """Update PDF page count."""
-    file = await get_file_by_id(db, file_id)
-    if file:
-        file.page_count = page_count
-        await db.commit()
-        return True
-    return False
+    """Update PDF page count (the file BLOB is never loaded)."""
+    result = await db.execute(
+        update(File).where(File.id == file_id).values(page_count=page_count)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def finalize_file(
+    db: AsyncSession,
+    file_id: str,
+    page_count: Optional[int] = None,
+    status: str = "completed"
+) -> bool:
+    """
+    Set the final processing status (and page count, when known) in one UPDATE.
+
+    Args:
+        db: Database session
+        file_id: File ID
+        page_count: PDF page count; left unchanged when None
+        status: Final processing status
+
+    Returns:
+        True if a file row was updated
+    """
+    values = {"processing_status": status}
+    if page_count:
+        values["page_count"] = page_count
+    result = await db.execute(
+        update(File).where(File.id == file_id).values(**values)
+    )
+    await db.commit()
+    return result.rowcount > 0
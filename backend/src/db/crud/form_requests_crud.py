@@ -4,7 +4,7 @@ CRUD operations for form requests and actions.
 import uuid
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -147,40 +147,59 @@ async def update_form_request_status(
 async def create_form_actions(
     db: AsyncSession,
     request_id: str,
-    actions: List[dict]
+    actions: List[dict],
+    final_status: Optional[str] = None,
+    fields_detected: Optional[int] = None
 ) -> List[FormAction]:
     """
     Create form actions for a request.
 
+    When final_status is given, the request status is updated in the same
+    transaction as the action inserts.
+
     Args:
         db: Database session
         request_id: Request ID
         actions: List of action dictionaries
+        final_status: Optional status to set on the request (e.g. completed)
+        fields_detected: Optional number of fields detected
 
     Returns:
         List of created FormAction objects
     """
-    db_actions = []
-
-    for idx, action_data in enumerate(actions):
-        db_action = FormAction(
-            request_id=request_id,
-            action_type=action_data.get("action_type", ""),
-            selector=action_data.get("selector", ""),
-            value=action_data.get("value"),
-            label=action_data.get("label", ""),
-            order_index=idx
+    if actions:
+        # Single executemany INSERT instead of one ORM flush per row
+        await db.execute(
+            insert(FormAction),
+            [
+                {
+                    "request_id": request_id,
+                    "action_type": action_data.get("action_type", ""),
+                    "selector": action_data.get("selector", ""),
+                    "value": action_data.get("value"),
+                    "label": action_data.get("label", ""),
+                    "order_index": idx,
+                }
+                for idx, action_data in enumerate(actions)
+            ],
         )
-        db_actions.append(db_action)
-        db.add(db_action)
 
-    await db.commit()
+    if final_status is not None:
+        values = {"status": final_status}
+        if final_status in ["completed", "failed"]:
+            values["completed_at"] = datetime.now(timezone.utc)
+        if fields_detected is not None:
+            values["fields_detected"] = fields_detected
+        await db.execute(
+            update(FormRequest).where(FormRequest.id == request_id).values(**values)
+        )
 
-    # Refresh all actions
-    for action in db_actions:
-        await db.refresh(action)
+    await db.commit()
 
-    return db_actions
+    # MySQL has no INSERT ... RETURNING; load the generated rows in one query
+    if not actions:
+        return []
+    return await get_form_actions(db, request_id)
 
 
 async def get_form_actions(
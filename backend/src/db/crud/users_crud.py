@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from ..models.db_user import User
+from .api_tokens_crud import invalidate_user_api_token_cache
 from ...core.enums import UserRole, ThemePreference
 
 
@@ -123,6 +124,8 @@ async def update_user(db: AsyncSession, db_user: User, update_data: dict):
         setattr(db_user, key, value)
     await db.commit()
     await db.refresh(db_user)
+    if not db_user.is_active:
+        invalidate_user_api_token_cache(db_user.id)
     return db_user
 
 async def change_user_password(db: AsyncSession, db_user: User, hashed_password: str):
@@ -152,8 +155,10 @@ async def delete_user(db: AsyncSession, db_user: User):
     # 1. Delete all notes associated with the user
     
     # 11. Finally, delete the user
+    user_id = db_user.id
     await db.delete(db_user)
     await db.commit()
+    invalidate_user_api_token_cache(user_id)
     return db_user
 
 
@@ -26,6 +26,43 @@ class QualityProfile:
 
 DEFAULT_QUALITY = "fast"
 
+# Prompt templates are built once at import; per-call work is a single str.format
+_SOLUTION_QUERY_TEMPLATE = """Analyze the following form question and provide an appropriate solution/answer.
+
+Session Instructions (highest priority):
+{session_instructions}
+
+Personal Instructions:
+{personal_instructions}
+
+Document Context:
+{context_section}
+
+----------------------------------------
+
+Form Question:
+```json
+{question_json}
+```
+
+Provide only the solution/answer as plain text. Do not include explanations unless necessary.
+"""
+
+_ACTION_QUERY_TEMPLATE = """Convert the following form questions and their solutions into precise browser actions.
+
+Questions and Solutions:
+```json
+{questions_json}
+```
+
+For each question:
+1. Read the solution
+2. Match the solution to the appropriate inputs
+3. Generate the correct actions using the exact selectors provided
+
+Output a flat list of all actions across all questions.
+"""
+
 MODEL_CONFIG: Dict[str, QualityProfile] = {
     "fast": QualityProfile(
         parser_model="gemini-2.5-flash",
@@ -195,6 +232,7 @@ Visible Text Content:
 
         solution_agent = self.solution_flash if solution_model == "gemini-2.5-flash" else self.solution_pro
         instructions_text = personal_instructions or "No personal instructions provided."
+        session_instructions = clipboard_text or "No session instructions provided"
 
         semaphore = asyncio.Semaphore(10)
 
@@ -251,30 +289,12 @@ Visible Text Content:
 
                     context_section = "\n".join(context_info) if context_info else "No uploaded documents available."
 
-                    solution_query = f"""Analyze the following form question and provide an appropriate solution/answer.
-
-
-
-Session Instructions (highest priority):
-{clipboard_text if clipboard_text else 'No session instructions provided'}
-
-Personal Instructions:
-{instructions_text}
-
-Document Context:
-{context_section}
-
-
-----------------------------------------
-
-
-Form Question:
-```json
-{json.dumps(question, indent=2)}
-```
-
-Provide only the solution/answer as plain text. Do not include explanations unless necessary.
-"""
+                    solution_query = _SOLUTION_QUERY_TEMPLATE.format(
+                        session_instructions=session_instructions,
+                        personal_instructions=instructions_text,
+                        context_section=context_section,
+                        question_json=json.dumps(question, indent=2),
+                    )
 
                     content = create_multipart_query(
                         query=solution_query,
@@ -416,20 +436,9 @@ Provide only the solution/answer as plain text. Do not include explanations unle
                         "solution": solution,
                     })
 
-                action_query = f"""Convert the following form questions and their solutions into precise browser actions.
-
-Questions and Solutions:
-```json
-{json.dumps(questions_data, indent=2)}
-```
-
-For each question:
-1. Read the solution
-2. Match the solution to the appropriate inputs
-3. Generate the correct actions using the exact selectors provided
-
-Output a flat list of all actions across all questions.
-"""
+                action_query = _ACTION_QUERY_TEMPLATE.format(
+                    questions_json=json.dumps(questions_data, indent=2),
+                )
 
                 from ..agents.utils import create_multipart_query
                 content = create_multipart_query(query=action_query)
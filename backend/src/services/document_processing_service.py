@@ -7,7 +7,7 @@ import io
 import logging
 import os
 import uuid
-from typing import List, Dict, Optional, Tuple
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from PIL import Image
 import fitz  # PyMuPDF
 import pytesseract
@@ -20,6 +20,7 @@ logger = logging.getLogger(__name__)
 CHUNK_SIZE_TOKENS = 1000
 CHUNK_OVERLAP_TOKENS = 200
 MAX_IMAGE_SIZE = (1024, 1024)  # Resize images for embedding
+PDF_CHUNK_BATCH_SIZE = 32  # Chunks handed to the indexer at a time
 
 
 class DocumentProcessingService:
@@ -33,24 +34,33 @@ class DocumentProcessingService:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
         logger.info(f"DocumentProcessingService initialized with Tesseract at: {tesseract_cmd}")
 
-    async def process_pdf(
+    async def iter_pdf_chunk_batches(
         self,
         file_id: str,
         user_id: str,
-        pdf_bytes: bytes
-    ) -> Tuple[List[Dict], int]:
+        pdf_bytes: bytes,
+        batch_size: int = PDF_CHUNK_BATCH_SIZE
+    ) -> AsyncIterator[Tuple[List[Dict], int]]:
         """
-        Process PDF into text and image chunks.
+        Process PDF into text and image chunks, yielding them in batches.
+
+        Extraction is suspended while the caller handles a batch (nothing runs in
+        parallel), but only one batch of chunk dicts (and image bytes) is held at a
+        time. Earlier batches may already be persisted when a later page fails, so
+        callers must clean up the file's chunks on error.
 
         Args:
             file_id: File ID from database
             user_id: User ID for ownership
             pdf_bytes: Raw PDF bytes
+            batch_size: Maximum number of chunks per batch
 
-        Returns:
-            Tuple of (chunks list, page_count)
+        Yields:
+            Tuples of (chunk batch, page_count). The final batch is always
+            yielded, possibly empty, so page_count reaches the caller.
         """
         chunks = []
+        total_chunks = 0
 
         try:
             # Open PDF with PyMuPDF
@@ -123,9 +133,16 @@ class DocumentProcessingService:
                     except Exception as e:
                         logger.warning(f"Failed to extract image {img_index} from page {page_num}: {e}")
 
+                # Hand off full batches at page boundaries
+                while len(chunks) >= batch_size:
+                    batch, chunks = chunks[:batch_size], chunks[batch_size:]
+                    total_chunks += len(batch)
+                    yield batch, page_count
+
             doc.close()
-            logger.info(f"PDF {file_id} processed: {len(chunks)} chunks extracted")
-            return chunks, page_count
+            total_chunks += len(chunks)
+            logger.info(f"PDF {file_id} processed: {total_chunks} chunks extracted")
+            yield chunks, page_count
 
         except Exception as e:
             logger.error(f"Error processing PDF {file_id}: {e}", exc_info=True)
@@ -2,6 +2,7 @@
 Service for generating text embeddings and managing ChromaDB text vector store.
 Uses Gemini embedding model for text chunks and OCR text from images.
 """
+import asyncio
 import logging
 from typing import List, Dict, Optional
 import chromadb
@@ -12,16 +13,18 @@ from ..config import settings as app_settings
 
 logger = logging.getLogger(__name__)
 
+# Max texts per batch embedding request (API limit)
+EMBED_BATCH_SIZE = 100
 
-class EmbeddingService:
-    """Manage text embeddings and ChromaDB vector store for text and OCR."""
+# Shared ChromaDB client (keeps one connection pool for all collections)
+_chroma_client = None
 
-    def __init__(self):
-        """Initialize ChromaDB client and text embedding functions."""
-        logger.info("Initializing EmbeddingService for text embeddings")
 
-        # Initialize ChromaDB client
-        self.chroma_client = chromadb.HttpClient(
+def get_chroma_client():
+    """Get or create the shared ChromaDB HTTP client."""
+    global _chroma_client
+    if _chroma_client is None:
+        _chroma_client = chromadb.HttpClient(
             host=app_settings.CHROMA_HOST,
             port=app_settings.CHROMA_PORT,
             settings=Settings(
@@ -30,6 +33,18 @@ class EmbeddingService:
             ),
             ssl=True
         )
+    return _chroma_client
+
+
+class EmbeddingService:
+    """Manage text embeddings and ChromaDB vector store for text and OCR."""
+
+    def __init__(self):
+        """Initialize ChromaDB client and text embedding functions."""
+        logger.info("Initializing EmbeddingService for text embeddings")
+
+        # Shared ChromaDB client
+        self.chroma_client = get_chroma_client()
 
         # Get or create TEXT collection (for text chunks and OCR)
         self.text_collection = self.chroma_client.get_or_create_collection(
@@ -60,7 +75,9 @@ class EmbeddingService:
             Embedding vector (configured dimensions, default 3072)
         """
         try:
-            result = genai.embed_content(
+            # Blocking SDK call, run off the event loop
+            result = await asyncio.to_thread(
+                genai.embed_content,
                 model=app_settings.TEXT_EMBEDDING_MODEL,
                 content=text,
                 task_type="retrieval_document",
@@ -72,6 +89,33 @@ class EmbeddingService:
             logger.error(f"Text embedding failed: {e}", exc_info=True)
             raise
 
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts with one request per EMBED_BATCH_SIZE texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Embedding vectors in input order
+        """
+        embeddings: List[List[float]] = []
+        try:
+            for start in range(0, len(texts), EMBED_BATCH_SIZE):
+                result = await asyncio.to_thread(
+                    genai.embed_content,
+                    model=app_settings.TEXT_EMBEDDING_MODEL,
+                    content=texts[start:start + EMBED_BATCH_SIZE],
+                    task_type="retrieval_document",
+                    output_dimensionality=app_settings.TEXT_EMBEDDING_DIMENSIONS
+                )
+                embeddings.extend(result['embedding'])
+            return embeddings
+
+        except Exception as e:
+            logger.error("Batch text embedding failed: %s", e, exc_info=True)
+            raise
+
     async def embed_ocr_text(self, caption: Optional[str] = None) -> List[float]:
         """
         Generate text embedding for OCR caption from image.
@@ -120,10 +164,7 @@ class EmbeddingService:
             for chunk in chunks:
                 # Generate embedding based on type
                 chunk_type = chunk["chunk_type"]
-                if hasattr(chunk_type, 'value'):
-                    chunk_type_str = chunk_type.value
-                else:
-                    chunk_type_str = str(chunk_type)
+                chunk_type_str = getattr(chunk_type, "value", chunk_type)
 
                 if chunk_type_str == "text":
                     embedding = await self.embed_text(chunk["content"])
@@ -167,8 +208,9 @@ class EmbeddingService:
 
                 ids.append(chunk["id"])  # Use chunk ID as Chroma ID
 
-            # Batch add to ChromaDB text collection
-            self.text_collection.add(
+            # Batch add to ChromaDB text collection (blocking HTTP call, run off the event loop)
+            await asyncio.to_thread(
+                self.text_collection.add,
                 embeddings=embeddings,
                 documents=documents,
                 metadatas=metadatas,
@@ -187,7 +229,8 @@ class EmbeddingService:
         query_text: str,
         user_id: str,
         top_k: int = 10,
-        file_ids: Optional[List[str]] = None
+        file_ids: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> List[Dict]:
         """
         Search for relevant chunks using semantic similarity in text collection.
@@ -197,13 +240,19 @@ class EmbeddingService:
             user_id: User ID for filtering
             top_k: Number of results to return
             file_ids: Optional list of file IDs to filter by
+            query_embedding: Precomputed embedding of query_text (skips re-embedding)
 
         Returns:
             List of matching chunks with metadata and similarity scores
+
+        Raises:
+            Exception: If embedding the query or querying ChromaDB fails, so callers
+                can tell a failed search from one without matches
         """
         try:
             # Generate query embedding
-            query_embedding = await self.embed_text(query_text)
+            if query_embedding is None:
+                query_embedding = await self.embed_text(query_text)
 
             # Build where filter for user isolation
             if file_ids:
@@ -219,7 +268,8 @@ class EmbeddingService:
                 where_filter = {"user_id": user_id}
 
             # Query ChromaDB text collection
-            results = self.text_collection.query(
+            results = await asyncio.to_thread(
+                self.text_collection.query,
                 query_embeddings=[query_embedding],
                 n_results=top_k,
                 where=where_filter,
@@ -242,7 +292,7 @@ class EmbeddingService:
 
         except Exception as e:
             logger.error(f"Search failed: {e}", exc_info=True)
-            return []
+            raise
 
     async def delete_file_chunks(self, file_id: str) -> bool:
         """
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..api.schemas import file as file_schema
 from ..db.crud import files_crud
+from .semantic_cache import get_retrieval_cache
 
 
 # File size limit: 200MB in bytes
@@ -184,6 +185,7 @@ async def delete_file(
 
     # Delete file
     success = await files_crud.delete_file(db, file_id)
+    get_retrieval_cache().invalidate_user(user_id)
 
     if not success:
         raise HTTPException(
@@ -5,12 +5,17 @@ This service analyzes HTML forms and generates appropriate values
 using AI and user context (uploaded files).
 """
 import asyncio
-import base64
+import binascii
 import logging
 import re
+import threading
+import time
 from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Set, Tuple
 
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..api.schemas import form as form_schema
@@ -19,51 +24,78 @@ from ..db.database import get_async_db_context
 from .agent_service import AgentService
 from .rag_service import get_rag_service
 
+try:
+    # SIMD-accelerated codec; falls back to the stdlib implementation.
+    import pybase64
+
+    def _b64decode(data: bytes) -> bytes:
+        return pybase64.b64decode(data, validate=False)
+except ImportError:  # pragma: no cover - optional dependency
+    _b64decode = binascii.a2b_base64
+
 logger = logging.getLogger(__name__)
 
 # Singleton instance of AgentService
 _agent_service = None
+_agent_lock = threading.Lock()
 
 
 def get_agent_service() -> AgentService:
     """Get or create the singleton AgentService instance."""
     global _agent_service
     if _agent_service is None:
-        _agent_service = AgentService()
+        with _agent_lock:
+            if _agent_service is None:
+                _agent_service = AgentService()
     return _agent_service
 
 
 _active_analysis_tasks: Dict[str, asyncio.Task] = {}
 
 
+# Whitespace patterns shared by the prompt/label cleaners, compiled once
+_MULTI_SPACE_RE = re.compile(r"[ \u00a0]{2,}")
+_SPACED_NEWLINE_RE = re.compile(r"[ \u00a0]*\n[ \u00a0]*")
+_EXCESS_NEWLINES_RE = re.compile(r"\n{3,}")
+_ANY_WHITESPACE_RE = re.compile(r"\s+")
+
+# Single-character replacements applied in one str.translate pass
+_PROMPT_SPACE_TABLE = str.maketrans({"\r": "\n", "\t": " ", "\x0c": " "})
+_BLOCK_SPACE_TABLE = str.maketrans({"\r": "\n", "\t": " ", "\x0c": " ", "\u00a0": " "})
+
+
 def _sanitize_prompt_text(text: Optional[str], *, collapse_whitespace: bool = True) -> Optional[str]:
     if text is None:
         return None
-    sanitized = text.replace("\r\n", "\n").replace("\r", "\n")
-    sanitized = sanitized.replace("\t", " ").replace("\x0c", " ")
+    sanitized = text.replace("\r\n", "\n").translate(_PROMPT_SPACE_TABLE)
     if collapse_whitespace:
-        sanitized = re.sub(r"[ \u00a0]{2,}", " ", sanitized)
-    sanitized = re.sub(r"\n{3,}", "\n\n", sanitized)
-    sanitized = sanitized.strip()
-    return sanitized
+        sanitized = _MULTI_SPACE_RE.sub(" ", sanitized)
+    sanitized = _EXCESS_NEWLINES_RE.sub("\n\n", sanitized)
+    return sanitized.strip()
 
 
 def _clean_text_block(text: Optional[str], *, preserve_newlines: bool) -> Optional[str]:
     if text is None:
         return None
-    text_str = str(text)
-    normalized = text_str.replace("\r\n", "\n").replace("\r", "\n")
-    normalized = normalized.replace("\t", " ").replace("\f", " ").replace("\u00a0", " ")
+    normalized = str(text).replace("\r\n", "\n").translate(_BLOCK_SPACE_TABLE)
     if preserve_newlines:
-        normalized = re.sub(r"[ \u00a0]{2,}", " ", normalized)
-        normalized = re.sub(r"[ \u00a0]*\n[ \u00a0]*", "\n", normalized)
-        normalized = re.sub(r"\n{3,}", "\n\n", normalized)
+        normalized = _MULTI_SPACE_RE.sub(" ", normalized)
+        normalized = _SPACED_NEWLINE_RE.sub("\n", normalized)
+        normalized = _EXCESS_NEWLINES_RE.sub("\n\n", normalized)
     else:
-        normalized = re.sub(r"\s+", " ", normalized)
+        normalized = _ANY_WHITESPACE_RE.sub(" ", normalized)
     return normalized.strip()
 
 
+@lru_cache(maxsize=512)
+def _clean_label_str(text: str) -> str:
+    # Option/action labels ("Yes", "No", country names...) repeat across inputs and requests
+    return _clean_text_block(text, preserve_newlines=False)
+
+
 def _clean_label_text(text: Optional[str]) -> Optional[str]:
+    if type(text) is str:
+        return _clean_label_str(text)
     return _clean_text_block(text, preserve_newlines=False)
 
 
@@ -72,35 +104,27 @@ def _normalize_parser_question(question: dict) -> dict:
 
     normalized = dict(question)
 
-    inline_keys = ("title",)
-    for key in inline_keys:
-        value = normalized.get(key)
-        if isinstance(value, str):
-            normalized[key] = _clean_label_text(value)
-
-    block_keys = ("description", "context")
-    for key in block_keys:
-        value = normalized.get(key)
-        if isinstance(value, str):
-            normalized[key] = _clean_text_block(value, preserve_newlines=True)
+    # The parser schema is fixed, so each known key is handled by a straight-line check
+    if isinstance(value := normalized.get("title"), str):
+        normalized["title"] = _clean_label_str(value)
+    if isinstance(value := normalized.get("description"), str):
+        normalized["description"] = _clean_text_block(value, preserve_newlines=True)
+    if isinstance(value := normalized.get("context"), str):
+        normalized["context"] = _clean_text_block(value, preserve_newlines=True)
 
     hints = normalized.get("hints")
-    if isinstance(hints, list):
-        cleaned_hints = []
-        for hint in hints:
-            if isinstance(hint, str):
-                cleaned_hint = _clean_text_block(hint, preserve_newlines=False)
-                if cleaned_hint:
-                    cleaned_hints.append(cleaned_hint)
-        normalized["hints"] = cleaned_hints
-
-    inputs = normalized.get("inputs") or []
-    cleaned_inputs: List[dict] = []
-    for raw_input in inputs:
-        cleaned_input = _normalize_question_input(raw_input)
-        if cleaned_input:
-            cleaned_inputs.append(cleaned_input)
-    normalized["inputs"] = cleaned_inputs
+    if type(hints) is list:
+        normalized["hints"] = [
+            cleaned
+            for hint in hints
+            if type(hint) is str and (cleaned := _clean_text_block(hint, preserve_newlines=False))
+        ]
+
+    normalized["inputs"] = [
+        cleaned
+        for raw_input in normalized.get("inputs") or ()
+        if (cleaned := _normalize_question_input(raw_input))
+    ]
 
     return normalized
 
@@ -111,23 +135,58 @@ def _normalize_question_input(input_data: Any) -> Optional[dict]:
 
     normalized = dict(input_data)
 
-    label_like_keys = ("option_label",)
-    for key in label_like_keys:
-        value = normalized.get(key)
-        if isinstance(value, str):
-            normalized[key] = _clean_label_text(value)
+    if isinstance(value := normalized.get("option_label"), str):
+        normalized["option_label"] = _clean_label_str(value)
+    if isinstance(value := normalized.get("current_value"), str):
+        normalized["current_value"] = _clean_text_block(value, preserve_newlines=True)
+    if isinstance(value := normalized.get("constraints"), str):
+        normalized["constraints"] = _clean_text_block(value, preserve_newlines=True)
+    if isinstance(value := normalized.get("notes"), str):
+        normalized["notes"] = _clean_text_block(value, preserve_newlines=True)
+    if isinstance(value := normalized.get("value_hint"), str):
+        normalized["value_hint"] = _clean_text_block(value, preserve_newlines=False)
+
+    return normalized
 
-    block_keys = ("current_value", "constraints", "notes")
-    for key in block_keys:
-        value = normalized.get(key)
-        if isinstance(value, str):
-            normalized[key] = _clean_text_block(value, preserve_newlines=True)
 
-    value_hint = normalized.get("value_hint")
-    if isinstance(value_hint, str):
-        normalized["value_hint"] = _clean_text_block(value_hint, preserve_newlines=False)
+def _decode_screenshot(screenshot_b64: str) -> bytes:
+    """Decode a base64 screenshot, stripping an optional data URL prefix."""
+    head, sep, payload = screenshot_b64.encode("ascii", "ignore").partition(b",")
+    return _b64decode(payload if sep else head)
 
-    return normalized
+
+def _decode_screenshots(screenshots: List[str]) -> List[bytes]:
+    """Decode base64 screenshots, skipping (and logging) any that fail."""
+    decoded_screenshots: List[bytes] = []
+    for idx, screenshot_b64 in enumerate(screenshots):
+        try:
+            decoded = _decode_screenshot(screenshot_b64)
+        except Exception as e:
+            logger.warning("Failed to decode screenshot %d: %s", idx, e)
+            continue
+        decoded_screenshots.append(decoded)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Screenshot %d: Successfully decoded %d bytes", idx, len(decoded))
+    return decoded_screenshots
+
+
+async def _skip_screenshots(screenshots: Optional[List[str]]) -> Optional[List[bytes]]:
+    """Basic mode: screenshots are not sent to the agents."""
+    return None
+
+
+async def _decode_request_screenshots(screenshots: Optional[List[str]]) -> Optional[List[bytes]]:
+    """Extended mode: decode screenshots in a worker thread so large payloads don't block the event loop."""
+    if not screenshots:
+        return None
+    return await asyncio.to_thread(_decode_screenshots, screenshots)
+
+
+# Screenshot step per analysis mode, resolved with a single lookup per request
+_SCREENSHOT_STEPS = {
+    "basic": _skip_screenshots,
+    "extended": _decode_request_screenshots,
+}
 
 
 def _extract_sanitized_inputs(request_data: form_schema.FormAnalyzeRequest) -> Tuple[str, str, str]:
@@ -183,60 +242,56 @@ async def analyze_form(
     Returns:
         FormAnalyzeResponse with actions
     """
+    started = time.perf_counter()
+    stats: Dict[str, Any] = {"user": user_id, "mode": request.mode, "quality": request.quality}
     try:
-        logger.info("=== Starting form analysis for user %s ===", user_id)
-        logger.info("Request mode: %s", request.mode)
+        logger.debug("=== Starting form analysis for user %s ===", user_id)
+        logger.debug("Request mode: %s", request.mode)
         html_clean, visible_clean, clipboard_clean = _extract_sanitized_inputs(request)
+        stats["html_len"] = len(html_clean)
         raw_html_len = len(request.html or "")
         raw_visible_len = len(request.visible_text or "")
         raw_clipboard_len = len(request.clipboard_text or "")
-        logger.info(
+        logger.debug(
             "HTML length: raw=%d chars, sanitized=%d chars",
             raw_html_len,
             len(html_clean),
         )
-        logger.info(
+        logger.debug(
             "Visible text length: raw=%d chars, sanitized=%d chars",
             raw_visible_len,
             len(visible_clean),
         )
-        logger.info(
+        logger.debug(
             "Clipboard text length: raw=%d chars, sanitized=%d chars",
             raw_clipboard_len,
             len(clipboard_clean),
         )
-        logger.info("Screenshots provided: %d", len(request.screenshots) if request.screenshots else 0)
+        logger.debug("Screenshots provided: %d", len(request.screenshots) if request.screenshots else 0)
 
         # Get AgentService singleton
         agent_service = get_agent_service()
-        logger.info("AgentService singleton retrieved")
+        logger.debug("AgentService singleton retrieved")
 
         # ===== PHASE 1: Parse HTML Form Structure =====
-        logger.info("Phase 1: Parsing HTML form structure for user %s", user_id)
+        logger.debug("Phase 1: Parsing HTML form structure for user %s", user_id)
+        phase_started = time.perf_counter()
 
         # Decode screenshots if provided (from base64)
-        screenshot_bytes = None
-        if request.screenshots and request.mode == "extended":
-            logger.info("Decoding %d screenshots for extended mode", len(request.screenshots))
-            screenshot_bytes = []
-            for idx, screenshot_b64 in enumerate(request.screenshots):
-                try:
-                    # Remove data URL prefix if present
-                    if ',' in screenshot_b64:
-                        logger.info("Screenshot %d: Removing data URL prefix", idx)
-                        screenshot_b64 = screenshot_b64.split(',', 1)[1]
-                    decoded = base64.b64decode(screenshot_b64)
-                    screenshot_bytes.append(decoded)
-                    logger.info("Screenshot %d: Successfully decoded %d bytes", idx, len(decoded))
-                except Exception as e:
-                    logger.warning("Failed to decode screenshot %d: %s", idx, e)
-            logger.info("Successfully decoded %d screenshots", len(screenshot_bytes))
+        screenshot_bytes = await _SCREENSHOT_STEPS[request.mode](request.screenshots)
+        stats["screenshots"] = len(screenshot_bytes) if screenshot_bytes else 0
+        if screenshot_bytes is not None:
+            logger.debug(
+                "Decoded %d screenshots totalling %d bytes",
+                len(screenshot_bytes),
+                sum(len(b) for b in screenshot_bytes),
+            )
         else:
-            logger.info("No screenshots to decode (either none provided or not in extended mode)")
+            logger.debug("No screenshots to decode (either none provided or not in extended mode)")
 
         # Call HTML Form Parser Agent
-        logger.info("Calling HTML Form Parser Agent...")
-        logger.info(
+        logger.debug("Calling HTML Form Parser Agent...")
+        logger.debug(
             "Parser input - user_id: %s, html length: %d, dom_text length: %d, clipboard length: %d, screenshots: %d",
             user_id,
             len(html_clean),
@@ -248,9 +303,9 @@ async def analyze_form(
         personal_instructions = await users_crud.get_user_personal_instructions(db, user_id)
         instructions_clean = _sanitize_prompt_text(personal_instructions, collapse_whitespace=False)
         if instructions_clean:
-            logger.info("Personal instructions length: %d chars", len(instructions_clean))
+            logger.debug("Personal instructions length: %d chars", len(instructions_clean))
         else:
-            logger.info("No personal instructions provided")
+            logger.debug("No personal instructions provided")
 
         parser_result = await agent_service.parse_form_structure(
             user_id=user_id,
@@ -262,12 +317,13 @@ async def analyze_form(
             personal_instructions=instructions_clean,
         )
 
-        logger.info("HTML Form Parser Agent returned result type: %s", type(parser_result))
-        logger.info(
-            "Parser result keys: %s",
-            parser_result.keys() if isinstance(parser_result, dict) else "NOT A DICT",
-        )
-        logger.info("Parser result preview: %s", str(parser_result)[:500])
+        logger.debug("HTML Form Parser Agent returned result type: %s", type(parser_result))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Parser result keys: %s",
+                parser_result.keys() if isinstance(parser_result, dict) else "NOT A DICT",
+            )
+            logger.debug("Parser result preview: %s", str(parser_result)[:500])
 
         # Validate parser result
         if not parser_result or "questions" not in parser_result:
@@ -281,7 +337,7 @@ async def analyze_form(
             )
 
         questions = parser_result["questions"]
-        logger.info("Phase 1 complete: Detected %d form questions", len(questions))
+        logger.debug("Phase 1 complete: Detected %d form questions", len(questions))
 
         normalized_questions: List[dict] = []
         total_inputs = 0
@@ -299,7 +355,11 @@ async def analyze_form(
             total_inputs += len(normalized.get("inputs") or [])
             normalized_questions.append(normalized)
 
-        if normalized_questions:
+        stats["phase1_ms"] = round((time.perf_counter() - phase_started) * 1000)
+        stats["questions"] = len(normalized_questions)
+        stats["fields"] = total_inputs
+
+        if normalized_questions and logger.isEnabledFor(logging.DEBUG):
             summaries = [
                 (
                     nq.get("title")
@@ -308,14 +368,14 @@ async def analyze_form(
                 )
                 for idx, nq in enumerate(normalized_questions[:5])
             ]
-            logger.info("Questions summary: %s", summaries)
+            logger.debug("Questions summary: %s", summaries)
 
             type_counter = Counter(q.get("question_type", "unknown") for q in normalized_questions)
-            logger.info("Question type distribution: %s", dict(type_counter))
+            logger.debug("Question type distribution: %s", dict(type_counter))
 
             max_logged_questions = 20
             for idx, question_data in enumerate(normalized_questions[:max_logged_questions]):
-                logger.info(
+                logger.debug(
                     "Question[%d]: id=%s | type=%s | title=%s | inputs=%d",
                     idx,
                     question_data.get("question_id"),
@@ -326,7 +386,7 @@ async def analyze_form(
 
                 sample_inputs = question_data.get("inputs") or []
                 for input_idx, input_data in enumerate(sample_inputs[:5]):
-                    logger.info(
+                    logger.debug(
                         "  - input[%d]: id=%s | type=%s | selector=%s | option_label=%s",
                         input_idx,
                         input_data.get("input_id"),
@@ -336,7 +396,7 @@ async def analyze_form(
                     )
 
             if len(normalized_questions) > max_logged_questions:
-                logger.info(
+                logger.debug(
                     "Additional questions omitted from log: showing %d of %d entries",
                     max_logged_questions,
                     len(normalized_questions),
@@ -344,7 +404,9 @@ async def analyze_form(
 
         # If no questions detected, return early
         if len(normalized_questions) == 0:
-            logger.info("No questions detected, returning early with success status")
+            stats["actions"] = 0
+            stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+            logger.info("analyze_form done: %s", stats)
             return form_schema.FormAnalyzeResponse(
                 status="success",
                 message="No form questions detected on this page",
@@ -353,23 +415,29 @@ async def analyze_form(
             )
 
         # ===== PHASE 2: Generate Solutions =====
-        logger.info(
+        logger.debug(
             "Phase 2: Generating solutions for %d questions (%d inputs)",
             len(normalized_questions),
             total_inputs,
         )
 
+        phase_started = time.perf_counter()
         rag_service = get_rag_service()
         use_rag = await rag_service.should_use_rag(db, user_id)
+        stats["rag"] = use_rag
 
         if use_rag:
-            logger.info("Using RAG for context retrieval")
+            logger.debug("Using RAG for context retrieval")
             question_contexts: Dict[str, Dict[str, List]] = {}
             total_text_chunks = 0
             total_image_chunks = 0
 
+            # Embed all queries in one batch and prefill the retrieval cache concurrently
+            question_queries = [build_search_query_for_question(question) for question in normalized_questions]
+            query_embeddings = await rag_service.warm_context_cache(question_queries, user_id, top_k=10)
+
             for q_idx, question in enumerate(normalized_questions):
-                question_query = build_search_query_for_question(question)
+                question_query = question_queries[q_idx]
                 question_id = str(question.get("question_id") or q_idx)
 
                 context = await rag_service.retrieve_relevant_context(
@@ -377,6 +445,7 @@ async def analyze_form(
                     query=question_query,
                     user_id=user_id,
                     top_k=10,
+                    query_embedding=query_embeddings.get(question_query),
                 )
 
                 question_contexts[question_id] = context
@@ -385,14 +454,14 @@ async def analyze_form(
                 total_text_chunks += text_count
                 total_image_chunks += image_count
 
-                logger.info(
+                logger.debug(
                     "Question %s RAG context: %d text chunks, %d image chunks",
                     question_id,
                     text_count,
                     image_count,
                 )
 
-            logger.info(
+            logger.debug(
                 "RAG retrieval complete for %d questions -> %d text chunks, %d image chunks",
                 len(normalized_questions),
                 total_text_chunks,
@@ -411,11 +480,11 @@ async def analyze_form(
                 screenshots=screenshot_bytes,
             )
         else:
-            logger.info("Using direct context (all files)")
+            logger.debug("Using direct context (all files)")
             user_files = await files_crud.get_user_files(db, user_id)
-            logger.info("Found %d user files for context", len(user_files))
-            if user_files:
-                logger.info("User files: %s", [f.filename for f in user_files[:5]])
+            logger.debug("Found %d user files for context", len(user_files))
+            if user_files and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("User files: %s", [f.filename for f in user_files[:5]])
 
             question_solutions = await agent_service.generate_solutions_per_question(
                 user_id=user_id,
@@ -428,23 +497,26 @@ async def analyze_form(
                 screenshots=screenshot_bytes,
             )
 
-        logger.info(
+        stats["phase2_ms"] = round((time.perf_counter() - phase_started) * 1000)
+        logger.debug(
             "Phase 2 complete: Generated %d solutions",
             len(question_solutions),
         )
 
         # ===== PHASE 3: Generate Actions from Solutions =====
-        logger.info(
+        logger.debug(
             "Phase 3: Converting %d solutions to actions",
             len(question_solutions),
         )
 
+        phase_started = time.perf_counter()
         generator_result = await agent_service.generate_actions_from_solutions(
             user_id=user_id,
             question_solution_pairs=question_solutions,
             quality=request.quality,
             batch_size=10,
         )
+        stats["phase3_ms"] = round((time.perf_counter() - phase_started) * 1000)
 
         if not generator_result or "actions" not in generator_result:
             logger.error("Action generator returned invalid result: %s", generator_result)
@@ -456,60 +528,20 @@ async def analyze_form(
             )
 
         # Convert to FormAction objects
-        logger.info("Converting %d actions to FormAction objects", len(generator_result["actions"]))
-        actions = []
-        for idx, action_data in enumerate(generator_result["actions"]):
-            try:
-                logger.info("Processing action %d: %s", idx, action_data)
-
-                # Map action_type to match browser extension expectations
-                original_type = action_data.get("action_type", "")
-                action_type = map_action_type(original_type)
-                logger.info("Action %d: Mapped type '%s' -> '%s'", idx, original_type, action_type)
-
-                value = action_data.get("value")
-                if isinstance(value, str):
-                    value = _clean_text_block(value, preserve_newlines=True)
-                requires_value = {"fillText", "setText", "selectDropdown", "selectCheckbox"}
-                if action_type in requires_value and value is None:
-                    logger.info(
-                        "Action %d skipped: '%s' requires value but received None (selector=%s)",
-                        idx,
-                        action_type,
-                        action_data.get("selector"),
-                    )
-                    continue
-
-                label = _clean_label_text(action_data.get("label"))
-                selector = action_data.get("selector", "")
-                if isinstance(selector, str):
-                    selector = selector.strip()
+        logger.debug("Converting %d actions to FormAction objects", len(generator_result["actions"]))
+        payload, skipped_actions = _build_action_rows(generator_result["actions"], clean_text=True)
+        stats["skipped_actions"] = skipped_actions
 
-                action = form_schema.FormAction(
-                    action_type=action_type,
-                    selector=selector,
-                    value=value,
-                    label=label or ""
-                )
-                actions.append(action)
-                logger.info("Action %d: Successfully created FormAction", idx)
-            except Exception as e:
-                logger.warning("Failed to create action from data %s: %s", action_data, e)
-                logger.exception("Action %d conversion error details:", idx)
-                continue
+        actions = _validate_actions(payload)
 
         optimized_actions = optimize_actions(actions)
 
-        logger.info("Phase 2 complete: Generated %d actions (optimized to %d)", len(actions), len(optimized_actions))
-        logger.info("Actions summary: %s", [f"{a.action_type}:{a.label}" for a in optimized_actions[:5]])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Actions summary: %s", [f"{a.action_type}:{a.label}" for a in optimized_actions[:5]])
 
-        # Return success response
-        logger.info(
-            "=== Form analysis complete: %d questions / %d inputs, %d actions ===",
-            len(normalized_questions),
-            total_inputs,
-            len(optimized_actions),
-        )
+        stats["actions"] = len(optimized_actions)
+        stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+        logger.info("analyze_form done: %s", stats)
         return form_schema.FormAnalyzeResponse(
             status="success",
             message=f"Successfully analyzed form with {len(normalized_questions)} questions ({total_inputs} inputs)",
@@ -518,9 +550,8 @@ async def analyze_form(
         )
 
     except Exception as e:
-        logger.exception("Error analyzing form: %s", e)
-        logger.error("Exception type: %s", type(e).__name__)
-        logger.error("Exception args: %s", e.args)
+        stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+        logger.exception("Error analyzing form: %s (stats: %s)", e, stats)
         return form_schema.FormAnalyzeResponse(
             status="error",
             message=f"Error analyzing form: {str(e)}",
@@ -529,6 +560,98 @@ async def analyze_form(
         )
 
 
+# Agent action type -> browser extension action type
+_ACTION_TYPE_MAP: Dict[str, str] = {
+    "fillText": "fillText",
+    "selectDropdown": "selectDropdown",
+    "selectRadio": "selectRadio",
+    "selectCheckbox": "selectCheckbox",
+    "click": "click",
+    "setText": "fillText",  # setText is alias for fillText
+}
+
+
+# Action types that are meaningless without a value
+_VALUE_REQUIRED_ACTIONS = frozenset({"fillText", "setText", "selectDropdown", "selectCheckbox"})
+
+_ACTIONS_ADAPTER = TypeAdapter(List[form_schema.FormAction])
+
+
+def _build_action_rows(raw_actions: List[Any], *, clean_text: bool) -> Tuple[List[dict], int]:
+    """
+    Convert generator output into action rows for the extension/database.
+
+    Args:
+        raw_actions: Actions returned by the action generator agent
+        clean_text: Normalize whitespace in values/labels and strip selectors
+
+    Returns:
+        Tuple of (action rows, number of actions skipped for a missing required value)
+    """
+    rows: List[dict] = []
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    skipped_actions = 0
+    malformed_actions = 0
+    for idx, action_data in enumerate(raw_actions):
+        if not isinstance(action_data, dict):
+            malformed_actions += 1
+            continue
+        if debug_enabled:
+            logger.debug("Processing action %d: %s", idx, action_data)
+
+        # Map action_type to match browser extension expectations
+        action_type = map_action_type(action_data.get("action_type", ""))
+
+        value = action_data.get("value")
+        if action_type in _VALUE_REQUIRED_ACTIONS and value is None:
+            skipped_actions += 1
+            if debug_enabled:
+                logger.debug(
+                    "Action %d skipped: '%s' requires value but received None (selector=%s)",
+                    idx,
+                    action_type,
+                    action_data.get("selector"),
+                )
+            continue
+
+        selector = action_data.get("selector", "")
+        label = action_data.get("label", "")
+        if clean_text:
+            if isinstance(value, str):
+                value = _clean_text_block(value, preserve_newlines=True)
+            if isinstance(selector, str):
+                selector = selector.strip()
+            label = _clean_label_text(label) or ""
+
+        rows.append({
+            "action_type": action_type,
+            "selector": selector,
+            "value": value,
+            "label": label,
+        })
+
+    if malformed_actions:
+        logger.warning("Ignored %d malformed (non-object) actions", malformed_actions)
+    return rows, skipped_actions
+
+
+def _validate_actions(payload: List[dict]) -> List[form_schema.FormAction]:
+    """Validate action dicts in one pass, dropping the rows that fail validation."""
+    try:
+        return _ACTIONS_ADAPTER.validate_python(payload)
+    except ValidationError as exc:
+        errors = exc.errors()
+        invalid_rows = {error["loc"][0] for error in errors if error["loc"]}
+        logger.warning(
+            "Dropping %d invalid actions (first error: %s)",
+            len(invalid_rows),
+            errors[0] if errors else "unknown",
+        )
+        return _ACTIONS_ADAPTER.validate_python(
+            [row for idx, row in enumerate(payload) if idx not in invalid_rows]
+        )
+
+
 def map_action_type(agent_action_type: str) -> str:
     """
     Map agent action types to browser extension action types.
@@ -542,17 +665,7 @@ def map_action_type(agent_action_type: str) -> str:
     Returns:
         Mapped action type for browser extension
     """
-    # Mapping table
-    mapping = {
-        "fillText": "fillText",
-        "selectDropdown": "selectDropdown",
-        "selectRadio": "selectRadio",
-        "selectCheckbox": "selectCheckbox",
-        "click": "click",
-        "setText": "fillText",  # setText is alias for fillText
-    }
-
-    return mapping.get(agent_action_type, "fillText")  # Default to fillText
+    return _ACTION_TYPE_MAP.get(agent_action_type, "fillText")  # Default to fillText
 
 
 def optimize_actions(actions: List[form_schema.FormAction]) -> List[form_schema.FormAction]:
@@ -627,6 +740,17 @@ def _radio_group_key(action: form_schema.FormAction) -> str:
 # ===== NEW: Async Background Task for Form Analysis =====
 
 
+@dataclass(slots=True)
+class _AnalyzeCtx:
+    """Per-request results of each analysis phase, filled in as the task progresses."""
+    screenshots: Optional[List[bytes]] = None
+    questions: List[dict] = field(default_factory=list)
+    total_inputs: int = 0
+    user_files: Optional[list] = None
+    solutions: List[dict] = field(default_factory=list)
+    actions: List[dict] = field(default_factory=list)
+
+
 async def process_form_analysis_async(
     request_id: str,
     user_id: str,
@@ -647,10 +771,19 @@ async def process_form_analysis_async(
     3. Saves actions to database
     4. Updates status to 'completed' or 'failed'
     """
+    ctx = _AnalyzeCtx()
+    started = time.perf_counter()
+    stats: Dict[str, Any] = {
+        "request_id": request_id,
+        "user": user_id,
+        "mode": request_data.mode,
+        "quality": request_data.quality,
+    }
     try:
-        logger.info("[AsyncTask %s] Starting background analysis for user %s", request_id, user_id)
+        logger.debug("[AsyncTask %s] Starting background analysis for user %s", request_id, user_id)
         html_clean, visible_clean, clipboard_clean = _extract_sanitized_inputs(request_data)
-        logger.info(
+        stats["html_len"] = len(html_clean)
+        logger.debug(
             "[AsyncTask %s] Input lengths - HTML raw=%d/sanitized=%d, visible raw=%d/sanitized=%d, clipboard raw=%d/sanitized=%d",
             request_id,
             len(request_data.html or ""),
@@ -661,55 +794,49 @@ async def process_form_analysis_async(
             len(clipboard_clean),
         )
 
-        personal_instructions = None
         async with get_async_db_context() as db:
             personal_instructions = await users_crud.get_user_personal_instructions(db, user_id)
             # Update status to processing_step_1 (parsing HTML form structure)
             await form_requests_crud.update_form_request_status(
                 db, request_id, "processing_step_1"
             )
-            logger.info("[AsyncTask %s] Status updated to 'processing_step_1'", request_id)
+            logger.debug("[AsyncTask %s] Status updated to 'processing_step_1'", request_id)
 
-        instructions_clean = _sanitize_prompt_text(personal_instructions, collapse_whitespace=False)
-        if instructions_clean:
-            logger.info(
-                "[AsyncTask %s] Personal instructions length: %d chars",
-                request_id,
-                len(instructions_clean),
-            )
-        else:
-            logger.info("[AsyncTask %s] No personal instructions provided", request_id)
+            instructions_clean = _sanitize_prompt_text(personal_instructions, collapse_whitespace=False)
+            if instructions_clean:
+                logger.debug(
+                    "[AsyncTask %s] Personal instructions length: %d chars",
+                    request_id,
+                    len(instructions_clean),
+                )
+            else:
+                logger.debug("[AsyncTask %s] No personal instructions provided", request_id)
 
-        # Get AgentService singleton
-        agent_service = get_agent_service()
+            # Get AgentService singleton
+            agent_service = get_agent_service()
 
-        # ===== PHASE 1: Parse HTML Form Structure =====
-        logger.info("[AsyncTask %s] Phase 1: Parsing HTML form structure", request_id)
-
-        # Decode screenshots if provided
-        screenshot_bytes = None
-        if request_data.screenshots and request_data.mode == "extended":
-            screenshot_bytes = []
-            for idx, screenshot_b64 in enumerate(request_data.screenshots):
-                try:
-                    if ',' in screenshot_b64:
-                        screenshot_b64 = screenshot_b64.split(',', 1)[1]
-                    decoded = base64.b64decode(screenshot_b64)
-                    screenshot_bytes.append(decoded)
-                except Exception as e:
-                    logger.warning("Failed to decode screenshot %d: %s", idx, e)
-
-        normalized_questions_async: List[dict] = []
-        async_total_inputs = 0
+            # ===== PHASE 1: Parse HTML Form Structure =====
+            logger.debug("[AsyncTask %s] Phase 1: Parsing HTML form structure", request_id)
+            phase_started = time.perf_counter()
+
+            # Decode screenshots if provided
+            ctx.screenshots = await _SCREENSHOT_STEPS[request_data.mode](request_data.screenshots)
+            stats["screenshots"] = len(ctx.screenshots) if ctx.screenshots else 0
+            if ctx.screenshots is not None:
+                logger.debug(
+                    "[AsyncTask %s] Decoded %d screenshots totalling %d bytes",
+                    request_id,
+                    len(ctx.screenshots),
+                    sum(len(b) for b in ctx.screenshots),
+                )
 
-        async with get_async_db_context() as db:
             # Call HTML Form Parser Agent
             parser_result = await agent_service.parse_form_structure(
                 user_id=user_id,
                 html=html_clean,
                 dom_text=visible_clean,
                 clipboard_text=clipboard_clean,
-                screenshots=screenshot_bytes,
+                screenshots=ctx.screenshots,
                 quality=request_data.quality,
                 personal_instructions=instructions_clean,
             )
@@ -723,7 +850,7 @@ async def process_form_analysis_async(
                 return
 
             questions = parser_result["questions"]
-            logger.info(
+            logger.debug(
                 "[AsyncTask %s] Phase 1 complete: Detected %d form questions",
                 request_id,
                 len(questions),
@@ -731,12 +858,15 @@ async def process_form_analysis_async(
 
             # If no questions detected, mark as completed with 0 actions
             if len(questions) == 0:
-                logger.info("[AsyncTask %s] No questions detected, marking as completed", request_id)
                 await form_requests_crud.update_form_request_status(
                     db, request_id, "completed", fields_detected=0
                 )
+                stats["questions"] = stats["actions"] = 0
+                stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+                logger.info("process_form_analysis_async done: %s", stats)
                 return
 
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
             for index, question in enumerate(questions):
                 raw_question: Optional[dict] = None
                 if hasattr(question, "model_dump"):
@@ -753,11 +883,11 @@ async def process_form_analysis_async(
                     continue
 
                 normalized_question = _normalize_parser_question(raw_question)
-                async_total_inputs += len(normalized_question.get("inputs") or [])
-                normalized_questions_async.append(normalized_question)
+                ctx.total_inputs += len(normalized_question.get("inputs") or [])
+                ctx.questions.append(normalized_question)
 
-                if index < 20:
-                    logger.info(
+                if index < 20 and debug_enabled:
+                    logger.debug(
                         "[AsyncTask %s] Question[%d]: id=%s | type=%s | title=%s | inputs=%d",
                         request_id,
                         index,
@@ -767,42 +897,54 @@ async def process_form_analysis_async(
                         len(normalized_question.get("inputs") or []),
                     )
 
-        # ===== PHASE 2: Generate Solutions =====
-        async with get_async_db_context() as db:
-            # Update status to processing_step_2 (generating solutions)
-            await form_requests_crud.update_form_request_status(
-                db, request_id, "processing_step_2"
-            )
-            logger.info("[AsyncTask %s] Status updated to 'processing_step_2' (generating solutions)", request_id)
+            stats["phase1_ms"] = round((time.perf_counter() - phase_started) * 1000)
+            stats["questions"] = len(ctx.questions)
+            stats["fields"] = ctx.total_inputs
 
-            logger.info(
+            # ===== PHASE 2: Generate Solutions =====
+            phase_started = time.perf_counter()
+            # Update status to processing_step_2 (generating solutions); fast mode skips
+            # the intermediate write since clients only wait for the terminal status
+            if request_data.quality != "fast":
+                await form_requests_crud.update_form_request_status(
+                    db, request_id, "processing_step_2"
+                )
+                logger.debug("[AsyncTask %s] Status updated to 'processing_step_2' (generating solutions)", request_id)
+
+            logger.debug(
                 "[AsyncTask %s] Phase 2: Generating solutions for %d questions (%d inputs)",
                 request_id,
-                len(normalized_questions_async),
-                async_total_inputs,
+                len(ctx.questions),
+                ctx.total_inputs,
             )
 
             # Get user context - use RAG or direct depending on file count/size
-            logger.info("[AsyncTask %s] Fetching user context...", request_id)
+            logger.debug("[AsyncTask %s] Fetching user context...", request_id)
             rag_service = get_rag_service()
             use_rag = await rag_service.should_use_rag(db, user_id)
+            stats["rag"] = use_rag
 
             if use_rag:
-                logger.info("[AsyncTask %s] Using RAG for context retrieval", request_id)
+                logger.debug("[AsyncTask %s] Using RAG for context retrieval", request_id)
 
                 question_contexts: Dict[str, Dict[str, List]] = {}
                 total_text_chunks = 0
                 total_image_chunks = 0
 
-                for q_idx, question in enumerate(normalized_questions_async):
-                    question_query = build_search_query_for_question(question)
+                # Embed all queries in one batch and prefill the retrieval cache concurrently
+                question_queries = [build_search_query_for_question(question) for question in ctx.questions]
+                query_embeddings = await rag_service.warm_context_cache(question_queries, user_id, top_k=10)
+
+                for q_idx, question in enumerate(ctx.questions):
+                    question_query = question_queries[q_idx]
                     question_id = str(question.get("question_id") or q_idx)
 
                     context = await rag_service.retrieve_relevant_context(
                         db=db,
                         query=question_query,
                         user_id=user_id,
-                        top_k=10
+                        top_k=10,
+                        query_embedding=query_embeddings.get(question_query),
                     )
 
                     question_contexts[question_id] = context
@@ -811,7 +953,7 @@ async def process_form_analysis_async(
                     total_text_chunks += text_count
                     total_image_chunks += image_count
 
-                    logger.info(
+                    logger.debug(
                         "[AsyncTask %s] Question %s RAG context: %d text chunks, %d image chunks",
                         request_id,
                         question_id,
@@ -819,69 +961,75 @@ async def process_form_analysis_async(
                         image_count,
                     )
 
-                logger.info(
+                logger.debug(
                     "[AsyncTask %s] RAG retrieval complete for %d questions -> %d text chunks, %d image chunks",
                     request_id,
-                    len(normalized_questions_async),
+                    len(ctx.questions),
                     total_text_chunks,
                     total_image_chunks,
                 )
 
                 # Call Solution Generator Agent with per-question RAG context
-                question_solutions = await agent_service.generate_solutions_per_question(
+                ctx.solutions = await agent_service.generate_solutions_per_question(
                     user_id=user_id,
-                    questions=normalized_questions_async,
+                    questions=ctx.questions,
                     visible_text=visible_clean,
                     clipboard_text=clipboard_clean,
                     user_files=None,  # Using RAG context instead
                     quality=request_data.quality,
                     personal_instructions=instructions_clean,
                     question_contexts=question_contexts,
-                    screenshots=screenshot_bytes,  # Pass screenshots directly
+                    screenshots=ctx.screenshots,  # Pass screenshots directly
                 )
             else:
-                logger.info("[AsyncTask %s] Using direct context (all files)", request_id)
+                logger.debug("[AsyncTask %s] Using direct context (all files)", request_id)
 
                 # Get user's uploaded files
-                user_files = await files_crud.get_user_files(db, user_id)
-                logger.info(
+                ctx.user_files = await files_crud.get_user_files(db, user_id)
+                logger.debug(
                     "[AsyncTask %s] Found %d user files for context",
                     request_id,
-                    len(user_files),
+                    len(ctx.user_files),
                 )
 
                 # Call Solution Generator Agent with direct files
-                question_solutions = await agent_service.generate_solutions_per_question(
+                ctx.solutions = await agent_service.generate_solutions_per_question(
                     user_id=user_id,
-                    questions=normalized_questions_async,
+                    questions=ctx.questions,
                     visible_text=visible_clean,
                     clipboard_text=clipboard_clean,
-                    user_files=user_files,
+                    user_files=ctx.user_files,
                     quality=request_data.quality,
                     personal_instructions=instructions_clean,
                 )
 
-            logger.info(
+            logger.debug(
                 "[AsyncTask %s] Phase 2 complete: Generated %d solutions",
                 request_id,
-                len(question_solutions),
+                len(ctx.solutions),
             )
 
-        # ===== PHASE 3: Generate Actions from Solutions =====
-        async with get_async_db_context() as db:
-            logger.info(
+            stats["phase2_ms"] = round((time.perf_counter() - phase_started) * 1000)
+
+            # End the read transaction so no connection is held during action generation
+            await db.commit()
+
+            # ===== PHASE 3: Generate Actions from Solutions =====
+            logger.debug(
                 "[AsyncTask %s] Phase 3: Converting %d solutions to actions",
                 request_id,
-                len(question_solutions),
+                len(ctx.solutions),
             )
 
             # Call Action Generator Agent (with batching)
+            phase_started = time.perf_counter()
             generator_result = await agent_service.generate_actions_from_solutions(
                 user_id=user_id,
-                question_solution_pairs=question_solutions,
+                question_solution_pairs=ctx.solutions,
                 quality=request_data.quality,
                 batch_size=10,
             )
+            stats["phase3_ms"] = round((time.perf_counter() - phase_started) * 1000)
 
             # Validate generator result
             if not generator_result or "actions" not in generator_result:
@@ -891,62 +1039,37 @@ async def process_form_analysis_async(
                 )
                 return
 
-            logger.info(
+            logger.debug(
                 "[AsyncTask %s] Phase 3 complete: Generated %d actions",
                 request_id,
                 len(generator_result["actions"]),
             )
 
-        # Save results to database
-        async with get_async_db_context() as db:
+            # Save results to database
             # Convert actions to dict format and filter out incomplete values only when required
-            actions_dict = []
-            required_value_actions = {"fillText", "selectDropdown", "selectCheckbox", "setText"}
-            for action_data in generator_result["actions"]:
-                original_type = action_data.get("action_type", "")
-                action_type = map_action_type(original_type)
-                value = action_data.get("value")
-
-                if action_type in required_value_actions and value is None:
-                    logger.info(
-                        "[AsyncTask %s] Skipping %s action with null value: %s",
-                        request_id,
-                        action_type,
-                        action_data.get("label", "unknown"),
-                    )
-                    continue
-
-                actions_dict.append({
-                    "action_type": action_type,
-                    "selector": action_data.get("selector", ""),
-                    "value": value,
-                    "label": action_data.get("label", "")
-                })
+            ctx.actions, skipped_actions = _build_action_rows(generator_result["actions"], clean_text=False)
 
-            # Save actions to database
+            # Save actions and mark the request completed in one transaction
             await form_requests_crud.create_form_actions(
-                db, request_id, actions_dict
-            )
-            logger.info(
-                "[AsyncTask %s] Saved %d actions to database",
-                request_id,
-                len(actions_dict),
-            )
-
-            # Update status to completed
-            await form_requests_crud.update_form_request_status(
                 db,
                 request_id,
-                "completed",
-                fields_detected=async_total_inputs
+                ctx.actions,
+                final_status="completed",
+                fields_detected=ctx.total_inputs
             )
-            logger.info("[AsyncTask %s] Status updated to 'completed'", request_id)
+            stats["actions"] = len(ctx.actions)
+            stats["skipped_actions"] = skipped_actions
+            stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+            logger.info("process_form_analysis_async done: %s", stats)
 
     except asyncio.CancelledError:
         logger.info("[AsyncTask %s] Cancelled before completion", request_id)
         raise
     except Exception as e:
-        logger.exception("[AsyncTask %s] Exception during async analysis: %s", request_id, e)
+        stats["total_ms"] = round((time.perf_counter() - started) * 1000)
+        logger.exception(
+            "[AsyncTask %s] Exception during async analysis: %s (stats: %s)", request_id, e, stats
+        )
 
         # Update status to failed
         try:
@@ -982,31 +1105,20 @@ def build_search_query_from_questions(questions: List[dict]) -> str:
 def build_search_query_for_question(question: dict, max_inputs: int = 10) -> str:
     """Assemble a semantic search query tailored to a single question."""
 
-    phrases: List[str] = []
+    # Bind the lookups once; this runs for every question of every RAG request
+    get = question.get
+    phrases: List[str] = [str(value).strip() for value in (get("title"), get("description")) if value]
+    phrases.extend(str(hint).strip() for hint in get("hints") or () if hint)
+
+    for input_data in (get("inputs") or [])[:max_inputs]:
+        input_get = input_data.get
+        phrases.extend(
+            str(candidate).strip()
+            for candidate in (input_get("option_label"), input_get("value_hint"), input_get("notes"))
+            if candidate
+        )
 
-    title = question.get("title")
-    if title:
-        phrases.append(str(title).strip())
-
-    description = question.get("description")
-    if description:
-        phrases.append(str(description).strip())
-
-    hints = question.get("hints") or []
-    for hint in hints:
-        if hint:
-            phrases.append(str(hint).strip())
-
-    inputs = (question.get("inputs") or [])[:max_inputs]
-    for input_data in inputs:
-        option_label = input_data.get("option_label")
-        value_hint = input_data.get("value_hint")
-        notes = input_data.get("notes")
-        for candidate in (option_label, value_hint, notes):
-            if candidate:
-                phrases.append(str(candidate).strip())
-
-    metadata = question.get("metadata")
+    metadata = get("metadata")
     if isinstance(metadata, dict):
         for value in metadata.values():
             if isinstance(value, str):
@@ -2,18 +2,22 @@
 Service for generating multimodal image embeddings using Vertex AI.
 Handles visual image embeddings separate from text embeddings.
 """
+import asyncio
 import base64
 import io
 import logging
+import threading
 from typing import List, Dict, Optional
-import chromadb
-from chromadb.config import Settings
 from PIL import Image
 
 from ..config import settings as app_settings
+from .embedding_service import get_chroma_client
 
 logger = logging.getLogger(__name__)
 
+# Metadata value types ChromaDB can store directly
+_SCALAR = (str, int, float, bool)
+
 # Lazy import Vertex AI (only if configured)
 _vertexai = None
 _MultiModalEmbeddingModel = None
@@ -37,8 +41,9 @@ def _get_vertex_ai():
                     location=app_settings.VERTEX_AI_LOCATION
                 )
                 logger.info(
-                    f"Vertex AI initialized: project={app_settings.VERTEX_AI_PROJECT}, "
-                    f"location={app_settings.VERTEX_AI_LOCATION}"
+                    "Vertex AI initialized: project=%s, location=%s",
+                    app_settings.VERTEX_AI_PROJECT,
+                    app_settings.VERTEX_AI_LOCATION,
                 )
             else:
                 logger.warning("VERTEX_AI_PROJECT not configured, image embeddings will be disabled")
@@ -46,13 +51,33 @@ def _get_vertex_ai():
                 _MultiModalEmbeddingModel = False
                 _ImageBytesInput = False
         except ImportError as e:
-            logger.warning(f"google-cloud-aiplatform not installed: {e}")
+            logger.warning("google-cloud-aiplatform not installed: %s", e)
             _vertexai = False
             _MultiModalEmbeddingModel = False
             _ImageBytesInput = False
     return _vertexai, _MultiModalEmbeddingModel, _ImageBytesInput
 
 
+def _is_image(chunk_type) -> bool:
+    """Return True for ChunkType.IMAGE or the plain "image" string."""
+    return getattr(chunk_type, "value", chunk_type) == "image"
+
+
+def _filter_metadata(metadata: Dict) -> Dict:
+    """Keep only metadata values ChromaDB can serialize (nulls and empty lists dropped)."""
+    filtered = {key: value for key, value in metadata.items() if isinstance(value, _SCALAR)}
+    for key, value in metadata.items():
+        if value is None or isinstance(value, _SCALAR):
+            continue
+        if isinstance(value, (list, tuple)):
+            items = [item for item in value if isinstance(item, _SCALAR)]
+            if items:
+                filtered[key] = items
+        else:
+            filtered[key] = str(value)
+    return filtered
+
+
 class ImageEmbeddingService:
     """Manage multimodal image embeddings and ChromaDB vector store for images."""
 
@@ -60,16 +85,8 @@ class ImageEmbeddingService:
         """Initialize ChromaDB client and image embedding model."""
         logger.info("Initializing ImageEmbeddingService for multimodal embeddings")
 
-        # Initialize ChromaDB client
-        self.chroma_client = chromadb.HttpClient(
-            host=app_settings.CHROMA_HOST,
-            port=app_settings.CHROMA_PORT,
-            settings=Settings(
-                anonymized_telemetry=False,
-                allow_reset=False
-            ),
-            ssl=True
-        )
+        # Shared ChromaDB client (same connection pool as the text collection)
+        self.chroma_client = get_chroma_client()
 
         # Get or create IMAGE collection (for visual embeddings)
         self.image_collection = self.chroma_client.get_or_create_collection(
@@ -78,24 +95,28 @@ class ImageEmbeddingService:
         )
 
         logger.info(
-            f"ChromaDB image collection '{app_settings.CHROMA_IMAGE_COLLECTION_NAME}' initialized with "
-            f"{self.image_collection.count()} existing images"
+            "ChromaDB image collection '%s' initialized with %d existing images",
+            app_settings.CHROMA_IMAGE_COLLECTION_NAME,
+            self.image_collection.count(),
         )
         logger.info(
-            f"Using image embedding model: {app_settings.IMAGE_EMBEDDING_MODEL} "
-            f"with {app_settings.IMAGE_EMBEDDING_DIMENSIONS} dimensions"
+            "Using image embedding model: %s with %d dimensions",
+            app_settings.IMAGE_EMBEDDING_MODEL,
+            app_settings.IMAGE_EMBEDDING_DIMENSIONS,
         )
 
         # Initialize Vertex AI model
-        vertexai_module, model_class, _ = _get_vertex_ai()
+        vertexai_module, model_class, image_input_class = _get_vertex_ai()
         self.vertex_available = bool(vertexai_module and app_settings.VERTEX_AI_PROJECT)
+        self._ImageBytesInput = image_input_class
+        self._dim = app_settings.IMAGE_EMBEDDING_DIMENSIONS
 
         if self.vertex_available:
             try:
                 self.model = model_class.from_pretrained(app_settings.IMAGE_EMBEDDING_MODEL)
-                logger.info(f"Multimodal embedding model loaded: {app_settings.IMAGE_EMBEDDING_MODEL}")
+                logger.info("Multimodal embedding model loaded: %s", app_settings.IMAGE_EMBEDDING_MODEL)
             except Exception as e:
-                logger.error(f"Failed to load multimodal model: {e}")
+                logger.error("Failed to load multimodal model: %s", e)
                 self.vertex_available = False
                 self.model = None
         else:
@@ -117,23 +138,47 @@ class ImageEmbeddingService:
             return None
 
         try:
-            _, _, ImageBytesInput = _get_vertex_ai()
-
             # Create image input from bytes
-            image = ImageBytesInput(image_bytes=image_bytes)
+            image = self._ImageBytesInput(image_bytes=image_bytes)
 
-            # Generate embedding
-            embeddings = self.model.get_embeddings(
+            # Generate embedding (blocking SDK call, run off the event loop)
+            embeddings = await asyncio.to_thread(
+                self.model.get_embeddings,
                 image=image,
-                dimension=app_settings.IMAGE_EMBEDDING_DIMENSIONS
+                dimension=self._dim
             )
 
             return embeddings.image_embedding
 
         except Exception as e:
-            logger.error(f"Image embedding failed: {e}", exc_info=True)
+            logger.error("Image embedding failed: %s", e, exc_info=True)
             return None
 
+    async def embed_images_batch(self, images: List[bytes]) -> List[Optional[List[float]]]:
+        """
+        Generate embeddings for several images, one request per image.
+
+        multimodalembedding@001 accepts a single image per prediction, so this
+        issues one embed_image request per image concurrently (bounded by
+        VERTEX_MAX_CONCURRENCY); there is no single batched RPC.
+
+        Args:
+            images: Raw image bytes, one entry per image
+
+        Returns:
+            Embedding vectors in input order (None for images that failed)
+        """
+        if not images:
+            return []
+
+        semaphore = asyncio.Semaphore(app_settings.VERTEX_MAX_CONCURRENCY or 8)
+
+        async def embed_one(image_bytes: bytes) -> Optional[List[float]]:
+            async with semaphore:
+                return await self.embed_image(image_bytes)
+
+        return await asyncio.gather(*(embed_one(image_bytes) for image_bytes in images))
+
     async def add_image_chunks(self, chunks: List[Dict]) -> int:
         """
         Add image chunks to ChromaDB using visual embeddings.
@@ -144,7 +189,8 @@ class ImageEmbeddingService:
         Returns:
             Number of chunks added
         """
-        if not chunks:
+        # Text-only batches are common; bail out before any embedding setup
+        if not any(_is_image(chunk.get("chunk_type")) for chunk in chunks):
             return 0
 
         if not self.vertex_available:
@@ -152,82 +198,66 @@ class ImageEmbeddingService:
             return 0
 
         try:
-            embeddings = []
-            documents = []
-            metadatas = []
-            ids = []
-
+            # Only process image chunks that carry image bytes
+            image_chunks = []
             for chunk in chunks:
-                # Only process image chunks
-                chunk_type = chunk.get("chunk_type")
-                if hasattr(chunk_type, 'value'):
-                    chunk_type_str = chunk_type.value
-                else:
-                    chunk_type_str = str(chunk_type)
-
-                if chunk_type_str != "image":
+                if not _is_image(chunk.get("chunk_type")):
                     continue
-
-                # Get image bytes
-                image_bytes = chunk.get("raw_content")
-                if not image_bytes:
-                    logger.warning(f"Image chunk {chunk['id']} has no raw_content")
+                if not chunk.get("raw_content"):
+                    logger.warning("Image chunk %s has no raw_content", chunk["id"])
                     continue
+                image_chunks.append(chunk)
 
-                # Generate visual embedding
-                embedding = await self.embed_image(image_bytes)
+            if not image_chunks:
+                return 0
+
+            # Generate visual embeddings for all image chunks at once
+            chunk_embeddings = await self.embed_images_batch(
+                [chunk["raw_content"] for chunk in image_chunks]
+            )
+
+            embedded_chunks = []
+            embeddings = []
+            for chunk, embedding in zip(image_chunks, chunk_embeddings):
                 if embedding is None:
-                    logger.warning(f"Failed to embed image chunk {chunk['id']}")
+                    logger.warning("Failed to embed image chunk %s", chunk["id"])
                     continue
-
+                embedded_chunks.append(chunk)
                 embeddings.append(embedding)
-                documents.append(chunk.get("content", ""))  # Store OCR text for reference
-
-                # Store metadata
-                metadata_json = chunk.get("metadata_json", {}) or {}
-                filtered_metadata = {}
-                for key, value in metadata_json.items():
-                    if value is None:
-                        continue
-                    if isinstance(value, (str, int, float, bool)):
-                        filtered_metadata[key] = value
-                    elif isinstance(value, (list, tuple)):
-                        filtered_metadata[key] = [
-                            item for item in value
-                            if isinstance(item, (str, int, float, bool))
-                        ]
-                        if not filtered_metadata[key]:
-                            filtered_metadata.pop(key)
-                    else:
-                        filtered_metadata[key] = str(value)
-
-                metadatas.append({
-                    "user_id": chunk["user_id"],
-                    "file_id": chunk["file_id"],
-                    "chunk_id": chunk["id"],
-                    "chunk_type": chunk_type_str,
-                    **filtered_metadata
-                })
-
-                ids.append(chunk["id"])
 
             if not embeddings:
                 logger.warning("No valid image embeddings generated")
                 return 0
 
-            # Batch add to ChromaDB
-            self.image_collection.add(
+            # Stage the remaining columns for the batch add
+            ids = [chunk["id"] for chunk in embedded_chunks]
+            documents = [chunk.get("content", "") for chunk in embedded_chunks]  # OCR text for reference
+            raw_metas = [chunk.get("metadata_json", {}) or {} for chunk in embedded_chunks]
+            metadatas = [
+                {
+                    "user_id": chunk["user_id"],
+                    "file_id": chunk["file_id"],
+                    "chunk_id": chunk["id"],
+                    "chunk_type": "image",
+                    **_filter_metadata(metadata_json),
+                }
+                for chunk, metadata_json in zip(embedded_chunks, raw_metas)
+            ]
+
+            # Batch add to ChromaDB (blocking HTTP call, run off the event loop)
+            await asyncio.to_thread(
+                self.image_collection.add,
                 embeddings=embeddings,
                 documents=documents,
                 metadatas=metadatas,
                 ids=ids
             )
 
-            logger.info(f"Added {len(embeddings)} image chunks to ChromaDB with visual embeddings")
+            logger.info("Added %d image chunks to ChromaDB with visual embeddings", len(embeddings))
             return len(embeddings)
 
         except Exception as e:
-            logger.error(f"Failed to add image chunks to ChromaDB: {e}", exc_info=True)
+            logger.error("Failed to add image chunks to ChromaDB: %s", e, exc_info=True)
             raise
 
     async def search_images(
@@ -248,14 +278,19 @@ class ImageEmbeddingService:
 
         Returns:
             List of matching image chunks with metadata and similarity scores
+            (empty when Vertex AI is not configured)
+
+        Raises:
+            Exception: If embedding the query or querying ChromaDB fails
         """
         if not self.vertex_available or not self.model:
             logger.warning("Image search skipped: Vertex AI not available")
             return []
 
         try:
-            # Generate text query embedding using multimodal model
-            embeddings = self.model.get_embeddings(
+            # Generate text query embedding using multimodal model (blocking SDK call)
+            embeddings = await asyncio.to_thread(
+                self.model.get_embeddings,
                 contextual_text=query_text,
                 dimension=app_settings.IMAGE_EMBEDDING_DIMENSIONS
             )
@@ -272,7 +307,8 @@ class ImageEmbeddingService:
             where_filter = {"$and": where_conditions}
 
             # Query ChromaDB
-            results = self.image_collection.query(
+            results = await asyncio.to_thread(
+                self.image_collection.query,
                 query_embeddings=[query_embedding],
                 n_results=top_k,
                 where=where_filter,
@@ -290,12 +326,12 @@ class ImageEmbeddingService:
                         "similarity": 1 - results["distances"][0][i],
                     })
 
-            logger.info(f"Image search for '{query_text[:50]}...' returned {len(chunks)} results")
+            logger.info("Image search for '%s...' returned %d results", query_text[:50], len(chunks))
             return chunks
 
         except Exception as e:
-            logger.error(f"Image search failed: {e}", exc_info=True)
-            return []
+            logger.error("Image search failed: %s", e, exc_info=True)
+            raise
 
     async def delete_file_images(self, file_id: str) -> bool:
         """
@@ -311,20 +347,23 @@ class ImageEmbeddingService:
             self.image_collection.delete(
                 where={"file_id": file_id}
             )
-            logger.info(f"Deleted image chunks for file {file_id} from ChromaDB")
+            logger.info("Deleted image chunks for file %s from ChromaDB", file_id)
             return True
 
         except Exception as e:
-            logger.error(f"Failed to delete image chunks: {e}", exc_info=True)
+            logger.error("Failed to delete image chunks: %s", e, exc_info=True)
             return False
 
 
 # Singleton instance
 _image_embedding_service = None
+_image_embedding_lock = threading.Lock()
 
 def get_image_embedding_service() -> ImageEmbeddingService:
     """Get or create singleton ImageEmbeddingService."""
     global _image_embedding_service
     if _image_embedding_service is None:
-        _image_embedding_service = ImageEmbeddingService()
+        with _image_embedding_lock:
+            if _image_embedding_service is None:
+                _image_embedding_service = ImageEmbeddingService()
     return _image_embedding_service
@@ -2,14 +2,23 @@
 RAG Service - Orchestrates document processing, embedding, and retrieval.
 Handles both text embeddings (Gemini) and visual image embeddings (Vertex AI).
 """
+import asyncio
+import heapq
 import logging
-from typing import List, Dict, Optional, Any
+import threading
+from contextlib import aclosing
+from functools import cached_property
+from operator import itemgetter
+from typing import AbstractSet, FrozenSet, List, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..config import settings as app_settings
 from ..db.crud import files_crud
+from ..db.models.db_document_chunk import ChunkType
 from .document_processing_service import get_document_processing_service
 from .embedding_service import get_embedding_service
-from .image_embedding_service import get_image_embedding_service
+from .image_embedding_service import ImageEmbeddingService, get_image_embedding_service
+from .semantic_cache import get_retrieval_cache
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +27,11 @@ MAX_DIRECT_CONTEXT_SIZE = 50000  # 50K chars
 MAX_DIRECT_FILE_COUNT = 5
 MAX_DIRECT_FILE_PAGES = 10
 
+# Concurrent searches used by warm_context_cache
+WARM_CACHE_CONCURRENCY = 4
+
+_by_similarity = itemgetter("similarity")
+
 
 class RAGService:
     """Orchestrate RAG pipeline: processing, embedding, and retrieval."""
@@ -26,12 +40,16 @@ class RAGService:
         """Initialize RAG service."""
         self.doc_processor = get_document_processing_service()
         self.text_embedding_service = get_embedding_service()
-        self.image_embedding_service = get_image_embedding_service()
 
         # Keep legacy reference for backward compatibility
         self.embedding_service = self.text_embedding_service
 
-        logger.info("RAGService initialized with text and image embedding services")
+        logger.info("RAGService initialized (image embedding service is loaded on first use)")
+
+    @cached_property
+    def image_embedding_service(self) -> ImageEmbeddingService:
+        """Image embedding service, created on first access (loads the Vertex AI model)."""
+        return get_image_embedding_service()
 
     async def process_and_index_file(
         self,
@@ -63,15 +81,23 @@ class RAGService:
             await files_crud.update_file_status(db, file_id, "processing")
 
             # Process based on content type
-            chunks = []
             page_count = None
+            text_chunks_added = 0
+            image_chunks_added = 0
 
             if file.content_type == "application/pdf":
-                chunks, page_count = await self.doc_processor.process_pdf(
+                # Index PDF chunks batch by batch as pages are extracted; aclosing
+                # closes the PDF right away if indexing a batch raises
+                batches = self.doc_processor.iter_pdf_chunk_batches(
                     file_id=file_id,
                     user_id=user_id,
                     pdf_bytes=file.data
                 )
+                async with aclosing(batches):
+                    async for batch, page_count in batches:
+                        text_added, image_added = await self._index_chunks(db, batch)
+                        text_chunks_added += text_added
+                        image_chunks_added += image_added
             elif file.content_type.startswith("image/"):
                 chunks = await self.doc_processor.process_image(
                     file_id=file_id,
@@ -79,25 +105,17 @@ class RAGService:
                     image_bytes=file.data,
                     content_type=file.content_type
                 )
+                text_chunks_added, image_chunks_added = await self._index_chunks(db, chunks)
             else:
                 logger.warning(f"Unsupported content type: {file.content_type}")
                 await files_crud.update_file_status(db, file_id, "completed")
                 return False
 
-            # Store chunks in database
-            from ..db.crud import document_chunks_crud
-            await document_chunks_crud.create_chunks(db, chunks)
+            # Cached retrieval results no longer reflect this user's documents
+            get_retrieval_cache().invalidate_user(user_id)
 
-            # Generate text embeddings (OCR for images) and add to text collection
-            text_chunks_added = await self.text_embedding_service.add_chunks(chunks)
-
-            # Generate visual image embeddings and add to image collection
-            image_chunks_added = await self.image_embedding_service.add_image_chunks(chunks)
-
-            # Update file metadata
-            if page_count:
-                await files_crud.update_file_page_count(db, file_id, page_count)
-            await files_crud.update_file_status(db, file_id, "completed")
+            # Update file metadata and status in a single UPDATE
+            await files_crud.finalize_file(db, file_id, page_count=page_count)
 
             logger.info(
                 f"Successfully processed file {file_id}: "
@@ -108,9 +126,71 @@ class RAGService:
 
         except Exception as e:
             logger.error(f"Error processing file {file_id}: {e}", exc_info=True)
+            # Earlier batches may already be stored and embedded; a failed file must not be retrievable
+            await self._discard_file_index(db, file_id)
+            get_retrieval_cache().invalidate_user(user_id)
             await files_crud.update_file_status(db, file_id, "failed")
             return False
 
+    async def _discard_file_index(self, db: AsyncSession, file_id: str) -> None:
+        """
+        Remove the stored chunks and vectors of a file whose processing failed.
+
+        Args:
+            db: Database session (rolled back first, the failure may have left it unusable)
+            file_id: File ID
+        """
+        from ..db.crud import document_chunks_crud
+        try:
+            await db.rollback()
+            await document_chunks_crud.delete_chunks_by_file_id(db, file_id)
+        except Exception as e:
+            logger.error("Failed to delete stored chunks of file %s: %s", file_id, e, exc_info=True)
+
+        # Both log and swallow their own errors
+        await self.text_embedding_service.delete_file_chunks(file_id)
+        await self.image_embedding_service.delete_file_images(file_id)
+
+    async def _index_chunks(self, db: AsyncSession, chunks: List[Dict]) -> Tuple[int, int]:
+        """
+        Store chunks in the database, then add them to the text and image collections.
+
+        Args:
+            db: Database session
+            chunks: Chunk dicts from the document processor
+
+        Returns:
+            Tuple of (chunks added to text collection, chunks added to image collection)
+        """
+        if not chunks:
+            return 0, 0
+
+        # Store chunks in database
+        from ..db.crud import document_chunks_crud
+        await document_chunks_crud.create_chunks(db, chunks)
+
+        # Generate text embeddings (OCR for images) and visual image embeddings
+        # concurrently; the two collections use independent embedding backends
+        text_added, image_added = await asyncio.gather(
+            self.text_embedding_service.add_chunks(chunks),
+            self.image_embedding_service.add_image_chunks(chunks),
+            return_exceptions=True,
+        )
+
+        # A failed branch is only tolerated when the other one actually indexed chunks;
+        # otherwise nothing of this batch is searchable and the file must end up failed
+        if isinstance(text_added, BaseException):
+            if isinstance(image_added, BaseException) or not image_added:
+                raise text_added
+            logger.warning("Text indexing failed, continuing with image collection only: %s", text_added)
+            text_added = 0
+        elif isinstance(image_added, BaseException):
+            if not text_added:
+                raise image_added
+            logger.warning("Image indexing failed, continuing with text collection only: %s", image_added)
+            image_added = 0
+        return text_added, image_added
+
     async def should_use_rag(self, db: AsyncSession, user_id: str) -> bool:
         """
         Decide whether to use RAG or direct context injection.
@@ -122,37 +202,30 @@ class RAGService:
         Returns:
             True if RAG should be used
         """
-        user_files = await files_crud.get_user_files(db, user_id)
+        # Estimate: 1 PDF page ≈ 2000 chars
+        file_count, max_pdf_pages, total_size = await files_crud.get_user_files_summary(
+            db, user_id, pdf_chars_per_page=2000
+        )
 
-        if not user_files:
+        if not file_count:
             return False
 
-        # Calculate total size and check thresholds
-        total_size = 0
-        for file in user_files:
-            if file.content_type == "application/pdf":
-                # Estimate: 1 page ≈ 2000 chars
-                estimated_size = (file.page_count or 1) * 2000
-                total_size += estimated_size
-
-                # Large file threshold
-                if file.page_count and file.page_count > MAX_DIRECT_FILE_PAGES:
-                    logger.info(f"Using RAG: file {file.id} has {file.page_count} pages")
-                    return True
-            else:
-                total_size += file.file_size
+        # Large file threshold
+        if max_pdf_pages > MAX_DIRECT_FILE_PAGES:
+            logger.info("Using RAG: a file has %d pages", max_pdf_pages)
+            return True
 
         # Too many files
-        if len(user_files) > MAX_DIRECT_FILE_COUNT:
-            logger.info(f"Using RAG: {len(user_files)} files exceeds threshold")
+        if file_count > MAX_DIRECT_FILE_COUNT:
+            logger.info("Using RAG: %d files exceeds threshold", file_count)
             return True
 
         # Too much total content
         if total_size > MAX_DIRECT_CONTEXT_SIZE:
-            logger.info(f"Using RAG: total size {total_size} exceeds threshold")
+            logger.info("Using RAG: total size %d exceeds threshold", total_size)
             return True
 
-        logger.info(f"Using direct context: {len(user_files)} files, {total_size} chars")
+        logger.info("Using direct context: %d files, %d chars", file_count, total_size)
         return False
 
     async def retrieve_relevant_context(
@@ -160,7 +233,8 @@ class RAGService:
         db: AsyncSession,
         query: str,
         user_id: str,
-        top_k: int = 10
+        top_k: int = 10,
+        query_embedding: Optional[List[float]] = None
     ) -> Dict[str, List]:
         """
         Retrieve relevant text and image chunks for a query using dual retrieval.
@@ -174,106 +248,282 @@ class RAGService:
             query: Search query (e.g., form field labels)
             user_id: User ID for filtering
             top_k: Number of chunks to retrieve
+            query_embedding: Precomputed text embedding of query (skips re-embedding)
 
         Returns:
             Dict with 'text_chunks' and 'image_chunks' lists
         """
         try:
-            # Search text collection (text chunks + OCR)
-            text_results = await self.text_embedding_service.search(
-                query_text=query,
-                user_id=user_id,
-                top_k=top_k
+            # Serve near-identical queries (cosine >= threshold) from the semantic cache
+            cache = get_retrieval_cache()
+            if cache.enabled and query_embedding is None:
+                try:
+                    query_embedding = await self.text_embedding_service.embed_text(query)
+                except Exception as e:
+                    logger.warning("Query embedding for semantic cache failed: %s", e)
+            if cache.enabled and query_embedding is not None:
+                cached = cache.get(user_id, query_embedding, top_k)
+                if cached is not None:
+                    similarity_map, visual_hits = cached
+                    return await self._load_context(db, similarity_map, visual_hits, top_k)
+
+            similarity_map, visual_hits, degraded = await self._rank_chunks(
+                query, user_id, top_k, query_embedding
             )
+            context = await self._load_context(db, similarity_map, visual_hits, top_k)
+            logger.info(
+                "Retrieved %d text chunks and %d image chunks for %d ranked chunks",
+                len(context["text_chunks"]),
+                len(context["image_chunks"]),
+                len(similarity_map),
+            )
+            # Only the ranking is cached; chunk content is always re-read from the database.
+            # Rankings from a failed search branch, or without any hits, are never cached
+            if query_embedding is not None and not degraded and similarity_map:
+                cache.put(user_id, query_embedding, top_k, (similarity_map, visual_hits))
+            return context
+
+        except Exception as e:
+            logger.error(f"Context retrieval failed: {e}", exc_info=True)
+            return {"text_chunks": [], "image_chunks": []}
+
+    async def _rank_chunks(
+        self,
+        query: str,
+        user_id: str,
+        top_k: int,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[Dict[str, float], FrozenSet[str], bool]:
+        """
+        Run the text and visual searches and merge them into one ranking.
 
-            # Search image collection (visual image search)
-            image_results = await self.image_embedding_service.search_images(
+        Args:
+            query: Search query
+            user_id: User ID for filtering
+            top_k: Number of chunks to retrieve
+            query_embedding: Precomputed text embedding of query (skips re-embedding)
+
+        Returns:
+            Tuple of (chunk ID -> combined similarity in rank order, IDs found by the
+            visual search, whether a search backend failed)
+        """
+        # Search text collection (text chunks + OCR) and image collection
+        # (visual image search) concurrently; both searches run their blocking
+        # SDK/Chroma calls in worker threads, so they overlap
+        image_task = asyncio.create_task(
+            self.image_embedding_service.search_images(
                 query_text=query,
                 user_id=user_id,
                 top_k=max(5, top_k // 2)  # Get fewer images since they're more expensive
             )
+        )
+        try:
+            text_results = await self.text_embedding_service.search(
+                query_text=query,
+                user_id=user_id,
+                top_k=top_k,
+                query_embedding=query_embedding,
+            )
+        except asyncio.CancelledError:
+            # Don't leave the visual search running for an abandoned request
+            image_task.cancel()
+            raise
+        except Exception as e:
+            text_results = e
+
+        # Early exit: when all top_k text hits are high-confidence the visual search
+        # adds nothing, so it is cancelled (or its result dropped if already done)
+        skip_threshold = app_settings.RAG_SKIP_IMAGE_SEARCH_SIMILARITY
+        if (
+            skip_threshold > 0
+            and isinstance(text_results, list)
+            and len(text_results) >= top_k
+            and min(map(_by_similarity, text_results)) >= skip_threshold
+        ):
+            image_task.cancel()
+            image_results = []
+            logger.debug("Skipping visual search: %d confident text hits", len(text_results))
+        else:
+            try:
+                image_results = await image_task
+            except Exception as e:
+                image_results = e
+
+        # A failing backend only drops its own branch (and the result is not cached)
+        degraded = False
+        if isinstance(text_results, BaseException):
+            logger.error("Text search failed: %s", text_results)
+            text_results = []
+            degraded = True
+        if isinstance(image_results, BaseException):
+            logger.error("Visual search failed: %s", image_results)
+            image_results = []
+            degraded = True
+
+        # Merge both searches in one pass: max similarity per chunk, keyed in rank order
+        # (text hits first), which also dedupes the ids for the DB fetch
+        combined_similarity_map: Dict[str, float] = {r["chunk_id"]: r["similarity"] for r in text_results}
+        visual_hits = set()
+        for r in image_results:
+            chunk_id = r["chunk_id"]
+            similarity = r["similarity"]
+            if similarity > 0:
+                visual_hits.add(chunk_id)
+            previous = combined_similarity_map.get(chunk_id)
+            combined_similarity_map[chunk_id] = max(similarity, 0.0 if previous is None else previous)
+
+        logger.debug(
+            "Ranked %d chunks (text search: %d, visual search: %d)",
+            len(combined_similarity_map),
+            len(text_results),
+            len(image_results),
+        )
+        return combined_similarity_map, frozenset(visual_hits), degraded
+
+    async def _load_context(
+        self,
+        db: AsyncSession,
+        similarity_map: Dict[str, float],
+        visual_hits: AbstractSet[str],
+        top_k: int
+    ) -> Dict[str, List]:
+        """
+        Load ranked chunks from the database and split them into text and image context.
 
-            # Collect all unique chunk IDs from both searches
-            text_chunk_ids = [r["chunk_id"] for r in text_results]
-            image_chunk_ids = [r["chunk_id"] for r in image_results]
-            all_chunk_ids = list(set(text_chunk_ids + image_chunk_ids))
-
-            # Fetch full chunk data from database
-            from ..db.crud import document_chunks_crud
-            chunks = await document_chunks_crud.get_chunks_by_ids(db, all_chunk_ids)
-
-            # Create similarity maps from both searches
-            text_similarity_map = {r["chunk_id"]: r["similarity"] for r in text_results}
-            image_similarity_map = {r["chunk_id"]: r["similarity"] for r in image_results}
-
-            # Separate by type and merge similarities
-            text_chunks = []
-            image_chunks = []
-
-            file_cache: Dict[str, Optional[Any]] = {}
-
-            for chunk in chunks:
-                # Normalize file_id to a string key for caching
-                raw_file_id = getattr(chunk, "file_id", None)
-                file_id = str(raw_file_id) if raw_file_id is not None else ""
-                if not file_id:
-                    filename = "unknown file"
-                    file = None
-                else:
-                    if file_id not in file_cache:
-                        file_cache[file_id] = await files_crud.get_file_by_id(db, file_id)
-
-                    file = file_cache[file_id]
-                    filename = file.filename if file and getattr(file, "filename", None) else f"file:{file_id}"
-
-                chunk_type_str = chunk.chunk_type.value if hasattr(chunk.chunk_type, 'value') else str(chunk.chunk_type)
-
-                # Use max similarity from either search
-                text_sim = text_similarity_map.get(chunk.id, 0.0)
-                img_sim = image_similarity_map.get(chunk.id, 0.0)
-                combined_similarity = max(text_sim, img_sim)
-
-                if chunk_type_str == "text":
-                    text_chunks.append({
-                        "content": chunk.content,
-                        "source": f"{filename} (page {chunk.metadata_json.get('page', '?')})",
-                        "file_id": file_id,
-                        "similarity": combined_similarity
-                    })
-                elif chunk_type_str == "image":
-                    image_chunks.append({
-                        "image_bytes": chunk.raw_content,
-                        "description": chunk.content,  # OCR text
-                        "source": f"{filename} (page {chunk.metadata_json.get('page', '?')})",
-                        "file_id": file_id,
-                        "similarity": combined_similarity,
-                        "visual_match": img_sim > 0,  # Flag if found by visual search
-                    })
-
-            # Sort by similarity (descending)
-            text_chunks.sort(key=lambda x: x["similarity"], reverse=True)
-            image_chunks.sort(key=lambda x: x["similarity"], reverse=True)
+        Chunks that no longer exist (their file was deleted) are skipped.
 
-            logger.info(
-                f"Retrieved {len(text_chunks)} text chunks and {len(image_chunks)} image chunks "
-                f"(text search: {len(text_results)}, visual search: {len(image_results)})"
-            )
-            return {
-                "text_chunks": text_chunks,
-                "image_chunks": image_chunks
-            }
+        Args:
+            db: Database session
+            similarity_map: Chunk ID -> combined similarity, in rank order
+            visual_hits: IDs of chunks found by the visual search
+            top_k: Number of chunks to keep per kind
+
+        Returns:
+            Dict with 'text_chunks' and 'image_chunks' lists
+        """
+        # Fetch full chunk data and source filenames from database in one joined query
+        from ..db.crud import document_chunks_crud
+        rows = await document_chunks_crud.get_chunks_with_filenames_by_ids(db, list(similarity_map))
+
+        # Separate by type and merge similarities
+        text_chunks = []
+        image_chunks = []
+
+        for chunk, filename in rows:
+            file_id = str(chunk.file_id) if chunk.file_id is not None else ""
+            if not file_id:
+                filename = "unknown file"
+            elif not filename:
+                filename = f"file:{file_id}"
+
+            # Use max similarity from either search
+            combined_similarity = similarity_map.get(chunk.id, 0.0)
+
+            source = "%s (page %s)" % (filename, (chunk.metadata_json or {}).get("page", "?"))
+
+            # SQLEnum hydrates chunk_type to the ChunkType singleton, so identity is enough
+            chunk_type = chunk.chunk_type
+            if chunk_type is ChunkType.TEXT:
+                text_chunks.append({
+                    "content": chunk.content,
+                    "source": source,
+                    "file_id": file_id,
+                    "similarity": combined_similarity
+                })
+            elif chunk_type is ChunkType.IMAGE:
+                image_chunks.append({
+                    "image_bytes": chunk.raw_content,
+                    "description": chunk.content,  # OCR text
+                    "source": source,
+                    "file_id": file_id,
+                    "similarity": combined_similarity,
+                    "visual_match": chunk.id in visual_hits,  # Flag if found by visual search
+                })
+
+        # Keep the top_k most similar of each kind (descending)
+        return {
+            "text_chunks": heapq.nlargest(top_k, text_chunks, key=_by_similarity),
+            "image_chunks": heapq.nlargest(top_k, image_chunks, key=_by_similarity),
+        }
+
+    async def warm_context_cache(
+        self,
+        queries: List[str],
+        user_id: str,
+        top_k: int = 10
+    ) -> Dict[str, List[float]]:
+        """
+        Embed a batch of queries (e.g. all fields of a form) and prefill the semantic cache.
+
+        All queries are embedded in one batch request. When the cache is enabled,
+        queries within the cache threshold of an earlier one are skipped and the
+        rest are searched concurrently; only their rankings are cached. Callers
+        pass the returned embeddings to retrieve_relevant_context, which then
+        neither re-embeds the query nor searches again for cached ones.
+
+        Args:
+            queries: Search queries
+            user_id: User ID for filtering
+            top_k: Number of chunks to retrieve per query
 
+        Returns:
+            Dict mapping each query to its embedding (empty if batch embedding failed)
+        """
+        unique_queries = list(dict.fromkeys(q for q in queries if q))
+        if not unique_queries:
+            return {}
+
+        try:
+            embeddings = await self.text_embedding_service.embed_texts(unique_queries)
         except Exception as e:
-            logger.error(f"Context retrieval failed: {e}", exc_info=True)
-            return {"text_chunks": [], "image_chunks": []}
+            logger.warning("Skipping RAG cache warm-up, batch embedding failed: %s", e)
+            return {}
+        query_embeddings = dict(zip(unique_queries, embeddings))
+
+        cache = get_retrieval_cache()
+        if not cache.enabled:
+            return query_embeddings
+
+        # Queries already cached (or close to another query) need no retrieval
+        pending = [i for i, embedding in enumerate(embeddings) if cache.get(user_id, embedding, top_k) is None]
+        picked = [pending[i] for i in cache.representatives([embeddings[i] for i in pending])]
+        semaphore = asyncio.Semaphore(WARM_CACHE_CONCURRENCY)
+
+        async def retrieve(index: int) -> bool:
+            # Only the ranking is cached, so no chunks are loaded from the database here.
+            # Like retrieve_relevant_context, failed or empty rankings are not cached
+            async with semaphore:
+                similarity_map, visual_hits, degraded = await self._rank_chunks(
+                    unique_queries[index], user_id, top_k, embeddings[index]
+                )
+            if degraded or not similarity_map:
+                return False
+            cache.put(user_id, embeddings[index], top_k, (similarity_map, visual_hits))
+            return True
+
+        results = await asyncio.gather(*(retrieve(i) for i in picked), return_exceptions=True)
+        cached = 0
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("RAG cache warm-up retrieval failed: %s", result)
+            elif result:
+                cached += 1
+        logger.info(
+            "Warmed RAG cache: %d retrievals (%d cached) for %d unique queries",
+            len(picked), cached, len(unique_queries),
+        )
+        return query_embeddings
 
 
 # Singleton instance
 _rag_service = None
+_rag_lock = threading.Lock()
 
 def get_rag_service() -> RAGService:
     """Get or create singleton RAGService."""
     global _rag_service
     if _rag_service is None:
-        _rag_service = RAGService()
+        with _rag_lock:
+            if _rag_service is None:
+                _rag_service = RAGService()
     return _rag_service
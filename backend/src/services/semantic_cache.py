@@ -0,0 +1,166 @@
+"""
+Semantic cache for RAG retrieval results.
+Returns a cached result when a new query embedding is close enough (cosine) to a previous one.
+
+The cache is per process: with several workers, invalidation only reaches the worker that
+ran it, so other workers may serve a result for up to the TTL. Callers should therefore cache
+small, re-validated data (e.g. ranked chunk IDs that are re-read from the database) rather
+than document content.
+"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+from ..config import settings as app_settings
+
+logger = logging.getLogger(__name__)
+
+
+class _UserEntries:
+    """Cached entries of one user: a matrix of unit query vectors plus parallel metadata."""
+
+    __slots__ = ("vectors", "top_ks", "results", "expires_at", "last_used")
+
+    def __init__(self, dim: int):
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.top_ks: List[int] = []
+        self.results: List[Any] = []
+        self.expires_at: List[float] = []
+        self.last_used: List[float] = []
+
+    def drop(self, indexes: Sequence[int]) -> None:
+        if not indexes:
+            return
+        dropped = set(indexes)
+        keep = [i for i in range(len(self.results)) if i not in dropped]
+        self.vectors = self.vectors[keep]
+        self.top_ks = [self.top_ks[i] for i in keep]
+        self.results = [self.results[i] for i in keep]
+        self.expires_at = [self.expires_at[i] for i in keep]
+        self.last_used = [self.last_used[i] for i in keep]
+
+
+class SemanticCache:
+    """
+    Per-user cache of retrieval results keyed by query embedding.
+
+    A lookup hits when a cached query for the same user and top_k has cosine
+    similarity >= threshold with the new query and has not expired. Each user
+    keeps at most max_entries results; the least recently used one is evicted.
+    At most max_users users are tracked, least recently active dropped first.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int, max_users: int = 256):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_users = max_users
+        self._users: "OrderedDict[str, _UserEntries]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _unit(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def get(self, user_id: str, embedding: Sequence[float], top_k: int) -> Optional[Any]:
+        """Return the cached result of the closest matching query, or None."""
+        entries = self._users.get(user_id)
+        if not self.enabled or entries is None:
+            return None
+
+        now = time.monotonic()
+        entries.drop([i for i, expires_at in enumerate(entries.expires_at) if expires_at <= now])
+        query = self._unit(embedding)
+        if not entries.results or query is None or query.shape[0] != entries.vectors.shape[1]:
+            return None
+
+        similarities = entries.vectors @ query
+        for index in np.argsort(-similarities):
+            if similarities[index] < self.threshold:
+                break
+            if entries.top_ks[index] == top_k:
+                entries.last_used[index] = now
+                logger.debug("Semantic cache hit for user %s (similarity %.3f)", user_id, similarities[index])
+                return entries.results[index]
+        return None
+
+    def put(self, user_id: str, embedding: Sequence[float], top_k: int, result: Any) -> None:
+        """Store a retrieval result for the given query embedding."""
+        query = self._unit(embedding)
+        if not self.enabled or query is None:
+            return
+
+        now = time.monotonic()
+        self._sweep(now)
+        entries = self._users.get(user_id)
+        if entries is None or entries.vectors.shape[1] != query.shape[0]:
+            entries = self._users[user_id] = _UserEntries(query.shape[0])
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+        if len(entries.results) >= self.max_entries:
+            entries.drop([int(np.argmin(entries.last_used))])
+
+        entries.vectors = np.vstack([entries.vectors, query])
+        entries.top_ks.append(top_k)
+        entries.results.append(result)
+        entries.expires_at.append(now + self.ttl_seconds)
+        entries.last_used.append(now)
+
+    def _sweep(self, now: float) -> None:
+        """Drop expired entries of all users, and users left without entries."""
+        for user_id, entries in list(self._users.items()):
+            entries.drop([i for i, expires_at in enumerate(entries.expires_at) if expires_at <= now])
+            if not entries.results:
+                del self._users[user_id]
+
+    def representatives(self, embeddings: Sequence[Sequence[float]]) -> List[int]:
+        """
+        Greedily pick the queries that need their own retrieval.
+
+        A query is skipped when an earlier picked query is within the cache
+        threshold, since its lookup would hit that query's cached result.
+
+        Returns:
+            Indexes of the picked embeddings, in input order
+        """
+        picked: List[int] = []
+        if not embeddings:
+            return picked
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+        for index, vector in enumerate(matrix):
+            if picked and float(np.max(matrix[picked] @ vector)) >= self.threshold:
+                continue
+            picked.append(index)
+        return picked
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drop all cached results for a user (their indexed documents changed)."""
+        self._users.pop(user_id, None)
+
+
+# Singleton instance
+_retrieval_cache = None
+
+
+def get_retrieval_cache() -> SemanticCache:
+    """Get or create the singleton retrieval SemanticCache."""
+    global _retrieval_cache
+    if _retrieval_cache is None:
+        _retrieval_cache = SemanticCache(
+            threshold=app_settings.RAG_SEMANTIC_CACHE_THRESHOLD,
+            ttl_seconds=app_settings.RAG_SEMANTIC_CACHE_TTL_SECONDS,
+            max_entries=app_settings.RAG_SEMANTIC_CACHE_MAX_ENTRIES,
+        )
+    return _retrieval_cache
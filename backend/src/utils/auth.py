@@ -4,7 +4,9 @@ Utility functions for authentication and authorization.
 
 import asyncio
 import logging
-from typing import Any, Dict, Optional, Set
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
 from fastapi import Depends, HTTPException, status, Request
 from pydantic import BaseModel
 from sqlalchemy.exc import OperationalError
@@ -24,8 +26,54 @@ WRITE_ACCESS_LEVELS: Set[AccessLevel] = {
     AccessLevel.READ_WRITE,
 }
 
+# Raw claim values of the sets above, so the per-request check is a single set lookup
+_READ_ACCESS_VALUES: FrozenSet[str] = frozenset(level.value for level in READ_ACCESS_LEVELS)
+_WRITE_ACCESS_VALUES: FrozenSet[str] = frozenset(level.value for level in WRITE_ACCESS_LEVELS)
+
 logger = logging.getLogger(__name__)
 
+# Verified JWT payloads: token -> (payload, expires_at). Entries live at most
+# TOKEN_CACHE_TTL_SECONDS and never past the token's own "exp" claim.
+TOKEN_CACHE_TTL_SECONDS = 60.0
+TOKEN_CACHE_MAXSIZE = 10_000
+_token_cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+
+# Upper bound for a plausible access token; longer cookies are rejected without decoding
+MAX_JWT_LENGTH = 8192
+
+
+def _looks_like_jwt(token: str) -> bool:
+    """Cheap structural check (three segments, JSON header) before any signature work."""
+    return len(token) < MAX_JWT_LENGTH and token.count(".") == 2 and token.startswith("ey")
+
+
+def _verify_cached(token: Optional[str]) -> Dict[str, Any]:
+    """security.verify_token with a short-lived cache of verified payloads.
+
+    Invalid tokens are never cached, so they keep raising HTTPException.
+    """
+    if not token:
+        return security.verify_token(token)
+
+    now = time.time()
+    cached = _token_cache.get(token)
+    if cached is not None:
+        if cached[1] > now:
+            _token_cache.move_to_end(token)
+            return cached[0]
+        del _token_cache[token]
+
+    payload = security.verify_token(token)
+    expires_at = now + TOKEN_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, float(exp))
+    _token_cache[token] = (payload, expires_at)
+    while len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+        _token_cache.popitem(last=False)
+    return payload
+
 class TokenData(BaseModel):
     """Schema for the token data."""
     username: Optional[str] = None
@@ -34,18 +82,10 @@ class TokenData(BaseModel):
     role: Optional[enums.UserRole] = None
 
 
-def _ensure_access_level(payload: Dict[str, Any], allowed_levels: Set[AccessLevel]) -> None:
+def _ensure_access_level(payload: Dict[str, Any], allowed_values: FrozenSet[str]) -> None:
     """Check if the token has the required access level."""
     raw_value = payload.get("access_level")
-    try:
-        access_level = AccessLevel(raw_value)
-    except (ValueError, TypeError) as exc:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="The user doesn't have the required access level",
-        ) from exc
-
-    if access_level not in allowed_levels:
+    if not isinstance(raw_value, str) or raw_value not in allowed_values:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="The user doesn't have the required access level",
@@ -59,9 +99,9 @@ async def get_user_id(
     Return the user_id from the access token with write permissions (requires access_level='rw' or 'w').
     """
     # Check if the access token is provided and valid and contains user_id
-    payload = security.verify_token(access_token)
+    payload = _verify_cached(access_token)
     # check access level
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
     return payload.get("user_id")
 
 
@@ -73,9 +113,9 @@ async def get_read_only_user_id(
     Does not fetch the user from the database.
     """
     # Check if the access token is provided and valid and contains user_id
-    payload = security.verify_token(access_token)
+    payload = _verify_cached(access_token)
     # check access level
-    _ensure_access_level(payload, READ_ACCESS_LEVELS)
+    _ensure_access_level(payload, _READ_ACCESS_VALUES)
     return payload.get("user_id")
 
 
@@ -84,9 +124,9 @@ async def get_read_write_user_token_data(
 ) -> Dict[str, Any]:
     """Return the token data from the access token with read and write permissions."""
     # Check if the access token is provided and valid and contains user_id
-    payload = security.verify_token(access_token)
+    payload = _verify_cached(access_token)
     # check access level
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
     return payload
 
 async def get_user_id_optional(
@@ -97,11 +137,11 @@ async def get_user_id_optional(
     Does not fetch the user from the database.
     This is useful for endpoints where the user may not be required to be logged in.
     """
-    if not access_token:
+    if not access_token or not _looks_like_jwt(access_token):
         return None
 
     try:
-        payload = security.verify_token(access_token)
+        payload = _verify_cached(access_token)
         user_id = payload.get("user_id")
         return user_id
     except HTTPException:
@@ -116,8 +156,8 @@ async def get_admin_user_id(
     Does not fetch the user from the database, checks the role from the token.
     """
     # Check if the access token is provided and valid and contains user_id, role
-    payload = security.verify_token(access_token)
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    payload = _verify_cached(access_token)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
 
     if payload.get("role") != enums.UserRole.ADMIN.value:
         raise HTTPException(
@@ -132,8 +172,8 @@ async def get_admin_token_data(
 ) -> Dict[str, Any]:
     """Return the token data if the user is an admin."""
     # Check if the access token is provided and valid and contains user_id, role
-    payload = security.verify_token(access_token)
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    payload = _verify_cached(access_token)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
 
     if payload.get("role") != enums.UserRole.ADMIN.value:
         raise HTTPException(
@@ -149,8 +189,8 @@ async def get_read_write_user_id(
 ) -> user_model.User:
     """Return the user ID with read and write permissions.
     """
-    payload = security.verify_token(access_token)
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    payload = _verify_cached(access_token)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
 
     return payload.get("user_id")
 
@@ -174,6 +214,29 @@ async def get_token_from_header_or_cookie(request: Request) -> Optional[str]:
     return await get_access_token_from_cookie(request)
 
 
+# Strong references to in-flight last_used_at updates (the event loop only keeps weak ones)
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def _update_api_token_last_used(token_id: str) -> None:
+    """Record API token usage outside of the request path."""
+    from ..db.database import get_async_db_context
+    from ..db.crud import api_tokens_crud
+
+    try:
+        async with get_async_db_context() as db:
+            await api_tokens_crud.update_last_used(db, token_id)
+    except Exception as exc:
+        logger.warning("Failed to update last_used_at of API token %s: %s", token_id, exc)
+
+
+def _schedule_last_used_update(token_id: str) -> None:
+    """Fire-and-forget update of an API token's last_used_at timestamp."""
+    task = asyncio.create_task(_update_api_token_last_used(token_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
 async def get_user_id_from_api_token_or_cookie(
     request: Request,
 ) -> str:
@@ -200,6 +263,19 @@ async def get_user_id_from_api_token_or_cookie(
 
     # Check if it's an API token (starts with "easyform_")
     if token.startswith("easyform_"):
+        # Recently authenticated tokens skip the database entirely. last_used_at is
+        # only refreshed when the cache entry is (re)created, i.e. at most once per
+        # token per cache TTL in each worker
+        cached = api_tokens_crud.get_cached_api_token_auth(token)
+        if cached is not None:
+            token_id, user_id, expires_at = cached
+            if expires_at < datetime.now(timezone.utc):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="API token expired",
+                )
+            return user_id
+
         max_attempts = 3
         for attempt in range(1, max_attempts + 1):
             try:
@@ -228,8 +304,6 @@ async def get_user_id_from_api_token_or_cookie(
                             detail="API token is inactive",
                         )
 
-                    await api_tokens_crud.update_last_used(db, api_token.id)
-
                     user = await users_crud.get_active_user_by_id(db, api_token.user_id)
                     if not user:
                         raise HTTPException(
@@ -237,6 +311,8 @@ async def get_user_id_from_api_token_or_cookie(
                             detail="User not found or inactive",
                         )
 
+                    api_tokens_crud.cache_api_token_auth(token, api_token.id, api_token.user_id, expires_at)
+                    _schedule_last_used_update(api_token.id)
                     return api_token.user_id
             except OperationalError as exc:
                 logger.warning(
@@ -253,6 +329,6 @@ async def get_user_id_from_api_token_or_cookie(
                 await asyncio.sleep(0.2 * attempt)
 
     # Otherwise, it's a regular JWT access token from cookie
-    payload = security.verify_token(token)
-    _ensure_access_level(payload, WRITE_ACCESS_LEVELS)
+    payload = _verify_cached(token)
+    _ensure_access_level(payload, _WRITE_ACCESS_VALUES)
     return payload.get("user_id")
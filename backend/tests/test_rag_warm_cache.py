@@ -0,0 +1,109 @@
+"""
+Tests for RAGService.warm_context_cache and the semantic cache of rankings.
+Search backends are replaced by in-memory fakes; nothing is read from the database.
+"""
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SESSION_SECRET_KEY", "test-session-secret")
+
+pytest.importorskip("chromadb")
+pytest.importorskip("google.adk")
+pytest.importorskip("google.generativeai")
+pytest.importorskip("fitz")
+
+from backend.src.services import rag_service as rag_module  # noqa: E402
+from backend.src.services.semantic_cache import SemanticCache  # noqa: E402
+
+USER_ID = "user-1"
+
+# "name" and "full name" are near-duplicates (cosine ~0.99), "address" is unrelated
+EMBEDDINGS = {
+    "name": [1.0, 0.0, 0.0],
+    "full name": [0.99, 0.1, 0.0],
+    "address": [0.0, 1.0, 0.0],
+}
+
+
+class FakeTextSearch:
+    def __init__(self):
+        self.search_calls = []
+        self.fail = False
+
+    async def embed_texts(self, texts):
+        return [EMBEDDINGS[text] for text in texts]
+
+    async def embed_text(self, text):
+        return EMBEDDINGS[text]
+
+    async def search(self, query_text, user_id, top_k=10, file_ids=None, query_embedding=None):
+        self.search_calls.append(query_text)
+        if self.fail:
+            raise ConnectionError("chroma unavailable")
+        return [{"chunk_id": f"chunk-{query_text}", "content": "", "metadata": {}, "similarity": 0.5}]
+
+
+class FakeImageSearch:
+    async def search_images(self, query_text, user_id, top_k=5):
+        return []
+
+
+@pytest.fixture
+def rag(monkeypatch):
+    cache = SemanticCache(threshold=0.95, ttl_seconds=60, max_entries=64)
+    monkeypatch.setattr(rag_module, "get_retrieval_cache", lambda: cache)
+
+    # Skip __init__ so no ChromaDB / Vertex AI clients are created
+    service = object.__new__(rag_module.RAGService)
+    service.text_embedding_service = FakeTextSearch()
+    service.__dict__["image_embedding_service"] = FakeImageSearch()
+
+    async def load_context(db, similarity_map, visual_hits, top_k):
+        return {"text_chunks": list(similarity_map), "image_chunks": []}
+
+    service._load_context = load_context
+    return service
+
+
+def test_warm_up_searches_representatives_and_serves_cache_hits(rag):
+    search = rag.text_embedding_service
+    embeddings = asyncio.run(rag.warm_context_cache(["name", "full name", "address", "name"], USER_ID))
+
+    assert embeddings == EMBEDDINGS
+    # "full name" is covered by "name", and the duplicate "name" is only embedded once
+    assert sorted(search.search_calls) == ["address", "name"]
+
+    context = asyncio.run(
+        rag.retrieve_relevant_context(None, "full name", USER_ID, query_embedding=embeddings["full name"])
+    )
+    assert context["text_chunks"] == ["chunk-name"]
+    assert len(search.search_calls) == 2
+
+    # A second warm-up finds everything cached
+    asyncio.run(rag.warm_context_cache(["name", "address"], USER_ID))
+    assert len(search.search_calls) == 2
+
+
+def test_failed_search_is_not_cached(rag):
+    search = rag.text_embedding_service
+    search.fail = True
+    embeddings = asyncio.run(rag.warm_context_cache(["name"], USER_ID))
+    assert search.search_calls == ["name"]
+
+    context = asyncio.run(
+        rag.retrieve_relevant_context(None, "name", USER_ID, query_embedding=embeddings["name"])
+    )
+    assert context["text_chunks"] == []
+    assert search.search_calls == ["name", "name"]
+
+    # Once the backend recovers the query is searched again and then cached
+    search.fail = False
+    context = asyncio.run(
+        rag.retrieve_relevant_context(None, "name", USER_ID, query_embedding=embeddings["name"])
+    )
+    assert context["text_chunks"] == ["chunk-name"]
+    asyncio.run(rag.retrieve_relevant_context(None, "name", USER_ID, query_embedding=embeddings["name"]))
+    assert search.search_calls == ["name", "name", "name"]